@@ -0,0 +1,157 @@
+import logging
+import threading
+import traceback
+from collections import OrderedDict, deque
+from enum import Enum
+
+from typing import Callable
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from classes.transports.transport_base import transport_base
+
+
+class Queue_Policy(Enum):
+    DROP_OLDEST = 0x00
+    ''' when full, the oldest queued data is dropped '''
+    COALESCE = 0x01
+    ''' queued data from the same transport is merged; only the latest value of each variable is kept '''
+    BLOCK = 0x02
+    ''' when full, the reading transport waits; backpressure '''
+
+    @classmethod
+    def fromString(cls, name : str):
+        name = name.strip().upper()
+
+        #common alternative names
+        alias : dict[str,str] = {
+            "DROP"      : "DROP_OLDEST",
+            "OLDEST"    : "DROP_OLDEST",
+            "LATEST"    : "COALESCE",
+            "MERGE"     : "COALESCE",
+            "WAIT"      : "BLOCK"
+        }
+
+        if name in alias:
+            name = alias[name]
+
+        return getattr(cls, name)
+
+
+class bridge_queue:
+    ''' bounded queue in front of a bridged transport; a dispatcher thread writes to the transport, so a slow transport doesn't throttle the readers '''
+
+    transport : 'transport_base'
+    ''' destination transport '''
+
+    policy : Queue_Policy = Queue_Policy.DROP_OLDEST
+    max_size : int = 100
+
+    #counters
+    enqueued : int = 0
+    written : int = 0
+    dropped : int = 0
+    coalesced : int = 0
+    max_depth : int = 0
+
+    _items : deque
+    ''' (from_transport, info) '''
+
+    _pending : OrderedDict
+    ''' coalesce policy; from_transport.transport_name -> (from_transport, info) '''
+
+    on_drop : Callable[['transport_base', dict[str, str]], None] = None
+    ''' called with (from_transport, info) that was dropped or failed to write; ie: so a delta filter forwards it again '''
+
+    _condition : threading.Condition
+    _thread : threading.Thread = None
+    _log : logging.Logger = None
+
+    def __init__(self, transport : 'transport_base', policy : Queue_Policy = Queue_Policy.DROP_OLDEST, max_size : int = 100,
+                 on_drop : Callable[['transport_base', dict[str, str]], None] = None):
+        self.transport = transport
+        self.policy = policy
+        self.max_size = max_size if max_size > 0 else 1
+        self.on_drop = on_drop
+
+        self._items = deque()
+        self._pending = OrderedDict()
+        self._condition = threading.Condition()
+        self._log = logging.getLogger(__name__ + f"[{transport.transport_name}]")
+
+    @property
+    def depth(self) -> int:
+        return len(self._pending) if self.policy == Queue_Policy.COALESCE else len(self._items)
+
+    def put(self, from_transport : 'transport_base', info : dict[str, str]):
+        with self._condition:
+            self.enqueued += 1
+
+            if self.policy == Queue_Policy.COALESCE:
+                if from_transport.transport_name in self._pending:
+                    self._pending[from_transport.transport_name][1].update(info)
+                    self.coalesced += 1
+                else:
+                    if len(self._pending) >= self.max_size:
+                        self._drop(self._pending.popitem(last=False)[1])
+                    self._pending[from_transport.transport_name] = (from_transport, dict(info))
+
+            elif self.policy == Queue_Policy.BLOCK:
+                while len(self._items) >= self.max_size:
+                    self._condition.wait()
+                self._items.append((from_transport, info))
+
+            else: #drop oldest
+                if len(self._items) >= self.max_size:
+                    self._drop(self._items.popleft())
+                self._items.append((from_transport, info))
+
+            self.max_depth = max(self.max_depth, self.depth)
+            self._condition.notify_all()
+
+    def _drop(self, item : tuple['transport_base', dict[str, str]]):
+        self.dropped += 1
+        if self.on_drop:
+            self.on_drop(*item)
+
+    def get(self, timeout : float = None) -> tuple['transport_base', dict[str, str]]:
+        ''' returns (from_transport, info), or None on timeout '''
+        with self._condition:
+            if not self._condition.wait_for(lambda: self.depth > 0, timeout=timeout):
+                return None
+
+            if self.policy == Queue_Policy.COALESCE:
+                _, item = self._pending.popitem(last=False)
+            else:
+                item = self._items.popleft()
+
+            self._condition.notify_all()
+            return item
+
+    def start(self, write : Callable[['transport_base', dict[str, str]], None] = None):
+        ''' starts dispatcher thread; write defaults to transport.write_data '''
+        if write is None:
+            write = lambda from_transport, info: self.transport.write_data(info, from_transport)
+
+        self._thread = threading.Thread(target=self._dispatch, args=(write,), name="bridge[" + self.transport.transport_name + "]", daemon=True)
+        self._thread.start()
+
+    def _dispatch(self, write : Callable[['transport_base', dict[str, str]], None]):
+        reported_drops : int = 0
+        while True:
+            from_transport, info = self.get()
+            try:
+                write(from_transport, info)
+                self.written += 1
+            except Exception as err:
+                traceback.print_exc()
+                self._log.error(err)
+                if self.on_drop:
+                    self.on_drop(from_transport, info)
+
+            if self.dropped != reported_drops:
+                reported_drops = self.dropped
+                self._log.warning("queue full; " + self.stats())
+
+    def stats(self) -> str:
+        return ("depth: " + str(self.depth) + " max depth: " + str(self.max_depth) + " enqueued: " + str(self.enqueued)
+                + " written: " + str(self.written) + " coalesced: " + str(self.coalesced) + " dropped: " + str(self.dropped))
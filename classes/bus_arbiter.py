@@ -0,0 +1,101 @@
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from enum import Enum
+
+
+class Bus_Priority(Enum):
+    WRITE = 0x00
+    ''' writes are granted before any waiting reads '''
+    READ = 0x01
+
+
+class bus_arbiter:
+    ''' serializes access to one physical bus, such as a serial port shared by several transports;
+    waiting requests are granted by priority, then in the order they arrived '''
+
+    #this is specifically static
+    arbiters : dict[str, 'bus_arbiter'] = {}
+    ''' bus_id -> arbiter; see transport_base.bus_id, ie: the serial port for modbus_rtu '''
+    _arbiters_lock : threading.Lock = threading.Lock()
+
+    bus_id : str = ''
+
+    #counters
+    requests : int = 0
+    waits : int = 0
+    ''' requests that had to wait for the bus '''
+    max_wait : float = 0
+    busy_time : float = 0
+    ''' seconds the bus was held '''
+
+    _created_time : float = 0
+    _busy : bool = False
+    _busy_time_start : float = 0
+    _queue : list[tuple[int, int]]
+    ''' heap of (priority, ticket) '''
+    _tickets : itertools.count
+    _condition : threading.Condition
+
+    def __init__(self, bus_id : str = ''):
+        self.bus_id = bus_id
+        self._queue = []
+        self._tickets = itertools.count()
+        self._condition = threading.Condition()
+        self._created_time = time.monotonic()
+
+    @classmethod
+    def get(cls, bus_id : str) -> 'bus_arbiter':
+        ''' the arbiter for bus_id; transports on the same bus share it '''
+        with cls._arbiters_lock:
+            if bus_id not in cls.arbiters:
+                cls.arbiters[bus_id] = cls(bus_id)
+            return cls.arbiters[bus_id]
+
+    def acquire(self, priority : Bus_Priority = Bus_Priority.READ):
+        with self._condition:
+            ticket = next(self._tickets)
+            heapq.heappush(self._queue, (priority.value, ticket))
+            self.requests += 1
+
+            start = time.monotonic()
+            if self._busy or self._queue[0][1] != ticket:
+                self.waits += 1
+                while self._busy or self._queue[0][1] != ticket:
+                    self._condition.wait()
+
+            heapq.heappop(self._queue)
+            self._busy = True
+            self._busy_time_start = time.monotonic()
+            self.max_wait = max(self.max_wait, self._busy_time_start - start)
+
+    def release(self):
+        with self._condition:
+            self._busy = False
+            self.busy_time += time.monotonic() - self._busy_time_start
+            self._condition.notify_all()
+
+    @contextmanager
+    def request(self, priority : Bus_Priority = Bus_Priority.READ):
+        ''' holds the bus for the duration of the with block '''
+        self.acquire(priority)
+        try:
+            yield self
+        finally:
+            self.release()
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._queue)
+
+    @property
+    def utilization(self) -> float:
+        ''' fraction of the time the bus was held, since the arbiter was created '''
+        elapsed = time.monotonic() - self._created_time
+        return min(1, self.busy_time / elapsed) if elapsed > 0 else 0
+
+    def stats(self) -> str:
+        return ("bus: " + self.bus_id + " busy: " + str(round(self.utilization * 100, 1)) + "% requests: " + str(self.requests)
+                + " waited: " + str(self.waits) + " max wait: " + str(round(self.max_wait * 1000, 1)) + "ms queued: " + str(self.queue_depth))
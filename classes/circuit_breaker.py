@@ -0,0 +1,87 @@
+import time
+from enum import Enum
+
+
+class Breaker_State(Enum):
+    CLOSED = 0x00
+    ''' requests pass '''
+    OPEN = 0x01
+    ''' requests are skipped until the cool down has passed '''
+    HALF_OPEN = 0x02
+    ''' cool down passed; one probe request is let through '''
+
+
+class circuit_breaker:
+    ''' skips requests to something that keeps failing; opens after failure_threshold consecutive failures, then lets one probe through every cool_down seconds '''
+
+    name : str = ''
+
+    failure_threshold : int = 3
+    ''' consecutive failures before the breaker opens '''
+
+    cool_down : float = 60
+    ''' seconds the breaker stays open before probing '''
+
+    state : Breaker_State = Breaker_State.CLOSED
+    failures : int = 0
+    ''' consecutive failures '''
+
+    opened_time : float = 0
+    ''' monotonic time the breaker last opened, or last let a probe through '''
+
+    #counters
+    requests : int = 0
+    total_failures : int = 0
+    skipped : int = 0
+    trips : int = 0
+
+    def __init__(self, name : str = '', failure_threshold : int = 3, cool_down : float = 60):
+        self.name = name
+        self.failure_threshold = failure_threshold if failure_threshold > 0 else 1
+        self.cool_down = cool_down
+
+    def allow(self, now : float = None) -> bool:
+        ''' true if a request should be sent; moves an open breaker to half open once the cool down has passed '''
+        if self.state == Breaker_State.CLOSED:
+            return True
+
+        if now is None:
+            now = time.monotonic()
+
+        if now - self.opened_time >= self.cool_down: #probe; again after another cool down if the probe was never sent
+            self.state = Breaker_State.HALF_OPEN
+            self.opened_time = now
+            return True
+
+        self.skipped += 1
+        return False
+
+    def success(self):
+        self.requests += 1
+        self.failures = 0
+        self.state = Breaker_State.CLOSED
+
+    def failure(self, now : float = None) -> bool:
+        ''' returns true if this failure opened the breaker '''
+        self.requests += 1
+        self.total_failures += 1
+        self.failures += 1
+
+        if self.state == Breaker_State.OPEN:
+            return False
+
+        if self.state == Breaker_State.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = Breaker_State.OPEN
+            self.opened_time = now if now is not None else time.monotonic()
+            self.trips += 1
+            return True
+
+        return False
+
+    @property
+    def failure_rate(self) -> float:
+        return self.total_failures / self.requests if self.requests else 0
+
+    def stats(self) -> str:
+        return (self.name + " state: " + self.state.name.lower() + " failure rate: " + str(round(self.failure_rate * 100, 1)) + "%"
+                + " requests: " + str(self.requests) + " failures: " + str(self.total_failures) + " skipped: " + str(self.skipped) + " trips: " + str(self.trips))
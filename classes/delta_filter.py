@@ -0,0 +1,75 @@
+import time
+
+
+class delta_filter:
+    ''' forwards only values that changed since they were last forwarded; everything is forwarded again every full_refresh_interval '''
+
+    changes_only : bool = True
+    ''' when false, nothing is filtered ( stage is inactive ) '''
+
+    full_refresh_interval : float = 300
+    ''' seconds; 0 disables the full refresh '''
+
+    last_refresh : float = 0
+
+    deadbands : dict[str, tuple[float, bool]]
+    ''' variable name -> (deadband, is percentage); changes within the deadband are not forwarded, even when changes_only is disabled '''
+
+    _last_values : dict[str, object]
+    ''' variable name -> last forwarded value '''
+
+    def __init__(self, changes_only : bool = True, full_refresh_interval : float = 300, deadbands : dict[str, tuple[float, bool]] = None):
+        self.changes_only = changes_only
+        self.full_refresh_interval = full_refresh_interval
+        self.deadbands = deadbands if deadbands else {}
+        self._last_values = {}
+
+    def filter(self, info : dict[str, str], now : float = None) -> dict[str, str]:
+        ''' returns the part of info that should be forwarded '''
+        if not self.changes_only and not self.deadbands:
+            return info
+
+        if now is None:
+            now = time.monotonic()
+
+        if not self.last_refresh or (self.full_refresh_interval > 0 and now - self.last_refresh >= self.full_refresh_interval):
+            self.last_refresh = now
+            self._last_values.update(info)
+            return info
+
+        changed : dict[str, str] = {}
+        for name, value in info.items():
+            if name in self._last_values:
+                if name in self.deadbands:
+                    if self.within_deadband(self._last_values[name], value, *self.deadbands[name]):
+                        continue
+                elif self.changes_only and self._last_values[name] == value:
+                    continue
+
+            changed[name] = value
+            self._last_values[name] = value
+
+        return changed
+
+    @staticmethod
+    def within_deadband(last_value, value, deadband : float, percent : bool) -> bool:
+        numeric = (int, float)
+        if (not isinstance(value, numeric) or not isinstance(last_value, numeric)
+            or isinstance(value, bool) or isinstance(last_value, bool)): #codes / text; exact match only
+            return last_value == value
+
+        if percent:
+            deadband = abs(last_value) * deadband / 100
+
+        return abs(value - last_value) <= deadband
+
+    def invalidate(self, info : dict[str, str]):
+        ''' info was dropped before it was delivered; its values are forwarded again on the next call, unless a newer value was forwarded since '''
+        for name, value in info.items():
+            if name in self._last_values and self._last_values[name] == value:
+                del self._last_values[name]
+
+    def reset(self):
+        ''' forward everything on the next call '''
+        self.last_refresh = 0
+        self._last_values.clear()
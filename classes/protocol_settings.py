@@ -1,16 +1,23 @@
 import csv
-from dataclasses import dataclass
+import dataclasses
+from array import array
+from dataclasses import dataclass, fields
 from enum import Enum
 import glob
+import hashlib
 import logging
-from typing import Union
+from typing import Callable, Union
 from defs.common import strtoint
 import itertools
 import json
 import re
 import os
 import math
+import operator
+import pickle
 import ast
+import bisect
+import struct
 
 class Data_Type(Enum):
     BYTE = 1
@@ -177,7 +184,19 @@ class Registry_Type(Enum):
     HOLDING = 0x03
     INPUT = 0x04
     
-@dataclass
+def slotted(cls):
+    ''' adds __slots__ to a dataclass; dataclass(slots=True) requires python 3.10 '''
+    cls_dict = dict(cls.__dict__)
+    field_names = tuple(field.name for field in fields(cls))
+    cls_dict['__slots__'] = field_names
+    for name in field_names:
+        cls_dict.pop(name, None) #defaults live in __init__; class attributes would conflict with the slots
+    cls_dict.pop('__dict__', None)
+    cls_dict.pop('__weakref__', None)
+    return type(cls)(cls.__name__, cls.__bases__, cls_dict)
+
+@slotted
+@dataclass(frozen=True)
 class registry_map_entry:
     registry_type : Registry_Type
     register : int
@@ -189,9 +208,10 @@ class registry_map_entry:
     unit : str
     unit_mod : float
     concatenate : bool
-    concatenate_registers : list[int] 
+    concatenate_registers : tuple[int, ...]
 
-    values : list
+    values : tuple
+    ''' allowed values; ranges are kept as range objects '''
     value_regex : str = ""
 
     value_min : int = 0
@@ -209,6 +229,14 @@ class registry_map_entry:
  
     write_mode : WriteMode = WriteMode.READ
     ''' enable disable reading/writing '''
+
+    deadband : float = 0
+    ''' changes smaller or equal to the deadband are not forwarded; in reported units ( after unit mod ) '''
+    deadband_percent : bool = False
+    ''' deadband is a percentage of the last forwarded value '''
+
+    poll_interval : float = 0
+    ''' seconds between reads; 0 reads on every read_interval, -1 reads once '''
     
     def __str__(self):
         return self.variable_name
@@ -224,18 +252,45 @@ class registry_map_entry:
         # Hash based on tuple of object attributes
         return hash((self.variable_name, self.register_bit, self.register_byte, self.registry_type))
 
+    #frozen + slots; pickle can't use setattr
+    def __getstate__(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        for name, value in zip(self.__slots__, state):
+            object.__setattr__(self, name, value)
+
+
+class registry_map_columns:
+    ''' column view of a registry map; one compact array per field instead of one object per entry '''
+    __slots__ = ('entries', 'register', 'register_bit', 'data_type', 'unit_mod', 'concatenate', 'variable_name')
+
+    def __init__(self, map : list[registry_map_entry]):
+        self.entries : list[registry_map_entry] = map
+        self.register : array = array('l', (entry.register for entry in map))
+        self.register_bit : array = array('b', (entry.register_bit for entry in map))
+        self.data_type : array = array('H', (entry.data_type.value for entry in map))
+        self.unit_mod : array = array('d', (entry.unit_mod for entry in map))
+        self.concatenate : array = array('b', (entry.concatenate for entry in map))
+        self.variable_name : list[str] = [entry.variable_name for entry in map]
+
+    def __len__(self):
+        return len(self.entries)
+
 
 class protocol_settings:
     protocol : str
     transport : str
     settings_dir : str
-    variable_mask : list[str]
-    ''' list of variables to allow and exclude all others '''
-    variable_screen : list[str]
-    ''' list of variables to exclude '''
+    variable_mask : set[str]
+    ''' variables to allow and exclude all others; lower case '''
+    variable_screen : set[str]
+    ''' variables to exclude; lower case '''
     registry_map : dict[Registry_Type, list[registry_map_entry]] = {}
     registry_map_size : dict[Registry_Type, int] = {}
     registry_map_ranges : dict[Registry_Type, list[tuple]] = {}
+    registry_map_tiers : dict[Registry_Type, dict[float, list[tuple]]] = {}
+    ''' ranges per poll interval '''
 
     codes : dict[str, str]
     settings : dict[str, str]
@@ -243,10 +298,32 @@ class protocol_settings:
 
     byteorder : str = "big"
 
+    cache_dir : str = '.cache/protocols'
+    ''' compiled protocols are cached here, and reloaded while the source files are unchanged; empty to disable '''
+
+    CACHE_VERSION : int = 5
+    ''' bump when registry_map_entry or the parsing changes, to invalidate existing caches '''
+
+    _decoders : dict[int, tuple[list[registry_map_entry], int, list[tuple]]]
+    ''' id(map) -> (map, map length, decode plan) '''
+
+    _code_tables : dict[str, tuple[dict[int, str], dict[str, str]]]
+    ''' code key -> ( value -> label, label -> code key ); see get_code_tables '''
+
+    _flag_codes : dict[str, tuple[list[tuple[int, int, str]], list[tuple[int, str]]]]
+    ''' code key -> compiled flag table; see compile_flag_codes '''
+
+    _columns : dict[int, registry_map_columns]
+    ''' id(map) -> column view '''
+
+    _indexes : dict[Registry_Type, tuple]
+    ''' registry type -> (map, map length, by variable name, by documented name, by register) '''
+
     _log : logging.Logger = None
 
 
-    def __init__(self, protocol : str, settings_dir : str = 'protocols'):
+    def __init__(self, protocol : str, settings_dir : str = 'protocols', cache_dir : str = None, variable_mask : set[str] = None, variable_screen : set[str] = None):
+        ''' variable_mask / variable_screen default to variable_mask.txt / variable_screen.txt in the working directory '''
 
         #apply log level to logger
         self._log_level = getattr(logging, logging.getLevelName(logging.getLogger().getEffectiveLevel()), logging.INFO)
@@ -255,28 +332,29 @@ class protocol_settings:
 
         self.protocol = protocol
         self.settings_dir = settings_dir
+        if cache_dir is not None:
+            self.cache_dir = cache_dir
 
-        #load variable mask
-        self.variable_mask = []
-        if os.path.isfile('variable_mask.txt'):
-            with open('variable_mask.txt') as f:
-                for line in f:
-                    if line[0] == '#': #skip comment
-                        continue
+        self.registry_map = {registry_type : [] for registry_type in Registry_Type}
+        self.registry_map_size = {registry_type : 0 for registry_type in Registry_Type}
+        self.registry_map_ranges = {registry_type : [] for registry_type in Registry_Type}
+        self.registry_map_tiers = {registry_type : {} for registry_type in Registry_Type}
 
-                    self.variable_mask.append(line.strip().lower())
+        #load variable mask / screen
+        self.variable_mask = {name.strip().lower() for name in variable_mask} if variable_mask is not None else self.load_variable_list('variable_mask.txt')
+        self.variable_screen = {name.strip().lower() for name in variable_screen} if variable_screen is not None else self.load_variable_list('variable_screen.txt')
+        self.variable_mask.discard('')
+        self.variable_screen.discard('')
 
-        #load variable screen
-        self.variable_screen = []
-        if os.path.isfile('variable_screen.txt'):
-            with open('variable_screen.txt') as f:
-                for line in f:
-                    if line[0] == '#': #skip comment
-                        continue
+        cache_key : str = self.get_cache_key() if self.cache_dir else ''
+        if not cache_key or not self.load_cache(cache_key):
+            self.load__json() #load first, so priority to json codes
 
-                    self.variable_screen.append(line.strip().lower())
+            for registry_type in Registry_Type:
+                self.load_registry_map(registry_type)
 
-        self.load__json() #load first, so priority to json codes
+            if cache_key:
+                self.save_cache(cache_key)
 
         if "transport" in self.settings:
             self.transport = self.settings["transport"]
@@ -288,8 +366,128 @@ class protocol_settings:
         if "byteorder" in self.settings: #handle byte order for ints n stuff
             self.byteorder = self.settings["byteorder"]
 
+        #decode plans and indexes are derived, so they are built here rather than cached
+        self._decoders = {}
+        self._columns = {}
+        self._indexes = {}
+        self._flag_codes = {}
+        self._code_tables = {}
         for registry_type in Registry_Type:
-            self.load_registry_map(registry_type)
+            self.get_decoders(self.registry_map[registry_type])
+            self.get_indexes(registry_type)
+
+    @staticmethod
+    def load_variable_list(path : str) -> set[str]:
+        ''' one variable per line; lines starting with # are skipped '''
+        variables : set[str] = set()
+        if os.path.isfile(path):
+            with open(path) as f:
+                for line in f:
+                    if line[0] == '#': #skip comment
+                        continue
+
+                    variables.add(line.strip().lower())
+
+        variables.discard('')
+        return variables
+
+    @classmethod
+    def parse_variable_list(cls, value : str) -> set[str]:
+        ''' transport setting; path to a variable list file, or comma separated variable names '''
+        value = value.strip()
+        if os.path.isfile(value):
+            return cls.load_variable_list(value)
+
+        if '/' in value or '\\' in value or value.lower().endswith('.txt'): #a path, not variable names; don't silently mask everything out
+            raise FileNotFoundError("variable list not found: " + value)
+
+        return {name.strip().lower() for name in value.split(',') if name.strip()}
+
+    def get_source_files(self) -> list[str]:
+        ''' every file the protocol is compiled from, including ones that don't exist yet, such as overrides '''
+        files : list[str] = [self.find_protocol_file(self.protocol + '.json', self.settings_dir)]
+
+        for registry_type in Registry_Type:
+            if registry_type == Registry_Type.ZERO:
+                file = self.protocol + '.registry_map.csv'
+            else:
+                file = self.protocol + '.'+registry_type.name.lower()+'_registry_map.csv'
+
+            path = self.find_protocol_file(file, self.settings_dir)
+            files.append(path)
+            if path:
+                files.append(path[:-4] + '.override.csv')
+
+        return files
+
+    def get_cache_key(self) -> str:
+        ''' hash of the source files ( path, mtime, size ) and everything else that changes the compiled protocol '''
+        sources : list = []
+        for path in self.get_source_files():
+            if not path or not os.path.exists(path):
+                sources.append((path, None))
+                continue
+
+            stat = os.stat(path)
+            sources.append((os.path.abspath(path), stat.st_mtime_ns, stat.st_size))
+
+        key = (self.CACHE_VERSION, self.protocol, sources, sorted(self.variable_mask), sorted(self.variable_screen))
+        return hashlib.sha1(repr(key).encode()).hexdigest()
+
+    def get_cache_path(self) -> str:
+        ''' one cache file per settings dir and variable mask / screen, so transports with different masks don't overwrite each other's cache '''
+        key = (os.path.abspath(self.settings_dir), sorted(self.variable_mask), sorted(self.variable_screen))
+        settings_hash = hashlib.sha1(repr(key).encode()).hexdigest()[:8]
+        return os.path.join(self.cache_dir, self.protocol + '.' + settings_hash + '.pickle')
+
+    def load_cache(self, cache_key : str) -> bool:
+        ''' loads the compiled protocol; returns false if there is no cache or it is out of date '''
+        path = self.get_cache_path()
+        if not os.path.exists(path):
+            return False
+
+        try:
+            with open(path, 'rb') as f:
+                cache = pickle.load(f)
+        except Exception as err:
+            self._log.warning("protocol cache unreadable: " + path + " : " + str(err))
+            return False
+
+        if not isinstance(cache, dict) or cache.get('key') != cache_key:
+            return False
+
+        self.codes = cache['codes']
+        self.settings = cache['settings']
+        self.registry_map = cache['registry_map']
+        self.registry_map_size = cache['registry_map_size']
+        self.registry_map_ranges = cache['registry_map_ranges']
+        self.registry_map_tiers = cache['registry_map_tiers']
+        self._log.debug("loaded protocol from cache: " + path)
+        return True
+
+    def save_cache(self, cache_key : str):
+        if not hasattr(self, 'codes'): #protocol json not found; nothing worth caching
+            return
+
+        cache = {
+            'key' : cache_key,
+            'codes' : self.codes,
+            'settings' : self.settings,
+            'registry_map' : self.registry_map,
+            'registry_map_size' : self.registry_map_size,
+            'registry_map_ranges' : self.registry_map_ranges,
+            'registry_map_tiers' : self.registry_map_tiers
+        }
+
+        path = self.get_cache_path()
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            temp_path = path + '.' + str(os.getpid()) + '.tmp'
+            with open(temp_path, 'wb') as f:
+                pickle.dump(cache, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, path) #atomic; other processes never see a partial cache
+        except OSError as err:
+            self._log.warning("unable to write protocol cache: " + path + " : " + str(err))
 
     def get_registry_map(self, registry_type : Registry_Type = Registry_Type.ZERO) -> list[registry_map_entry]:
         return self.registry_map[registry_type]
@@ -307,13 +505,39 @@ class protocol_settings:
         return self.get_registry_entry(name, registry_type=Registry_Type.INPUT)
 
     def get_registry_entry(self, name : str, registry_type : Registry_Type) -> registry_map_entry:
-        
+        ''' by documented name '''
         name = name.strip().lower().replace(' ', '_') #clean name
-        for item in self.registry_map[registry_type]:
-            if item.documented_name == name:
-                return item
-        
-        return None
+        return self.get_indexes(registry_type)[3].get(name)
+
+    def get_variable_entry(self, name : str, registry_type : Registry_Type) -> registry_map_entry:
+        ''' by variable name '''
+        if not name:
+            return None
+        name = name.strip().lower().replace(' ', '_') #clean name
+        return self.get_indexes(registry_type)[2].get(name)
+
+    def get_register_entries(self, register : int, registry_type : Registry_Type) -> list[registry_map_entry]:
+        ''' every entry at a register, ie: bit fields sharing one register '''
+        return self.get_indexes(registry_type)[4].get(register, [])
+
+    def get_indexes(self, registry_type : Registry_Type) -> tuple:
+        ''' lookup tables for a registry map; rebuilt if the map was replaced or resized. the first entry wins for duplicate names '''
+        registry_map = self.registry_map[registry_type]
+        index = self._indexes.get(registry_type)
+        if index is not None and index[0] is registry_map and index[1] == len(registry_map):
+            return index
+
+        by_variable_name : dict[str, registry_map_entry] = {}
+        by_documented_name : dict[str, registry_map_entry] = {}
+        by_register : dict[int, list[registry_map_entry]] = {}
+        for entry in registry_map:
+            by_variable_name.setdefault(entry.variable_name, entry)
+            by_documented_name.setdefault(entry.documented_name, entry)
+            by_register.setdefault(entry.register, []).append(entry)
+
+        index = (registry_map, len(registry_map), by_variable_name, by_documented_name, by_register)
+        self._indexes[registry_type] = index
+        return index
 
     def load__json(self, file : str = '', settings_dir : str = ''):
         if not settings_dir:
@@ -507,7 +731,7 @@ class protocol_settings:
                         if groups['range_start'] and groups['range_end']:
                             start = strtoint(groups['range_start'])
                             end = strtoint(groups['range_end'])
-                            values.extend(range(start, end + 1))
+                            values.append(range(start, end + 1))
                         else:
                             values.append(groups['element'])
                 else:
@@ -589,6 +813,31 @@ class protocol_settings:
             writeMode : WriteMode = WriteMode.READ
             if "writable" in row:
                 writeMode = WriteMode.fromString(row['writable'])
+
+            #optional column; ie: 1s, 60s, 5m, once
+            poll_interval : float = 0
+            poll_column = 'poll' if 'poll' in row else 'interval'
+            if poll_column in row and row[poll_column] and row[poll_column].strip():
+                try:
+                    poll_interval = self.parse_poll_interval(row[poll_column])
+                except ValueError:
+                    self._log.warning("Invalid Poll Interval : " + str(row[poll_column]) + " reg: " + str(row['register']) + " path: " + str(path))
+
+            #optional column; absolute value or percentage, ie: 0.5 or 2%
+            deadband : float = 0
+            deadband_percent : bool = False
+            if "deadband" in row and row['deadband'] and row['deadband'].strip():
+                deadband_str : str = row['deadband'].strip()
+                if deadband_str.endswith('%'):
+                    deadband_percent = True
+                    deadband_str = deadband_str[:-1]
+
+                try:
+                    deadband = abs(float(deadband_str))
+                except ValueError:
+                    self._log.warning("Invalid Deadband : " + str(row['deadband']) + " reg: " + str(row['register']) + " path: " + str(path))
+                    deadband = 0
+                    deadband_percent = False
             
             for i in r:
                 item = registry_map_entry(
@@ -603,13 +852,16 @@ class protocol_settings:
                                             data_type= data_type,
                                             data_type_size = data_type_len,
                                             concatenate = concatenate,
-                                            concatenate_registers = concatenate_registers,
-                                            values=values,
+                                            concatenate_registers = tuple(concatenate_registers),
+                                            values=tuple(values),
                                             value_min=value_min,
                                             value_max=value_max,
                                             value_regex=value_regex,
                                             read_command = read_command,
-                                            write_mode=writeMode
+                                            write_mode=writeMode,
+                                            deadband=deadband,
+                                            deadband_percent=deadband_percent,
+                                            poll_interval=poll_interval
                                         )
                 registry_map.append(item)
 
@@ -666,49 +918,46 @@ class protocol_settings:
                         and registry_map[index-1].documented_name.replace('_h', '_l') == item.documented_name
                         ):
                         combined_item = registry_map[index-1]
+                        changes : dict = {}
 
                         if not combined_item.data_type or combined_item.data_type  == Data_Type.USHORT:
                             if registry_map[index].data_type != Data_Type.USHORT:
-                                combined_item.data_type = registry_map[index].data_type
+                                changes['data_type'] = registry_map[index].data_type
                             else:
-                                combined_item.data_type = Data_Type.UINT
+                                changes['data_type'] = Data_Type.UINT
 
 
                         if combined_item.documented_name == combined_item.variable_name:
-                            combined_item.variable_name = combined_item.variable_name[:-2].strip()
+                            changes['variable_name'] = combined_item.variable_name[:-2].strip()
                             
-                        combined_item.documented_name = combined_item.documented_name[:-2].strip()
+                        changes['documented_name'] = combined_item.documented_name[:-2].strip()
 
                         if not combined_item.unit: #fix inconsistsent documentation
-                            combined_item.unit = registry_map[index].unit
-                            combined_item.unit_mod = registry_map[index].unit_mod
+                            changes['unit'] = registry_map[index].unit
+                            changes['unit_mod'] = registry_map[index].unit_mod
 
+                        registry_map[index-1] = dataclasses.replace(combined_item, **changes) #entries are immutable
                         del registry_map[index]
 
-            #apply mask
+            #apply mask; before the ranges are calculated, so excluded registers are never read
             if self.variable_mask:
-                for index in reversed(range(len(registry_map))):
-                    item = registry_map[index]
-                    if (
-                        item.documented_name.strip().lower() not in self.variable_mask 
-                        and item.variable_name.strip().lower() not in self.variable_mask
-                        ):
-                        del registry_map[index]
+                registry_map = [item for item in registry_map
+                                if item.documented_name.strip().lower() in self.variable_mask
+                                or item.variable_name.strip().lower() in self.variable_mask]
 
-            #apply variable screen     
+            #apply variable screen
             if self.variable_screen:
-                for index in reversed(range(len(registry_map))):
-                    item = registry_map[index]
-                    if (
-                        item.documented_name.strip().lower() in self.variable_mask 
-                        and item.variable_name.strip().lower() in self.variable_mask
-                        ):
-                        del registry_map[index]      
+                registry_map = [item for item in registry_map
+                                if item.documented_name.strip().lower() not in self.variable_screen
+                                and item.variable_name.strip().lower() not in self.variable_screen]
 
             return registry_map
         
-    def calculate_registry_ranges(self, map : list[registry_map_entry], max_register : int) -> list[tuple]:
-        ''' read optimization; calculate which ranges to read'''
+    def calculate_registry_ranges(self, map : list[registry_map_entry], unreadable : set[int] = None, gap_limit : int = None) -> list[tuple]:
+        ''' read optimization; calculate which ranges to read
+        registers are sorted once, then neighbours are merged into one request whenever reading the gap between them is cheaper than sending another request.
+        ranges never span read disabled / write only registers, or any register in unreadable.
+        gap_limit; largest gap to read through, defaults to get_max_read_gap from the protocol's settings '''
         max_batch_size = 45 #see manual; says max batch is 45
 
         if "batch_size" in self.settings:
@@ -717,27 +966,68 @@ class protocol_settings:
             except ValueError:
                 pass
 
-        start = -max_batch_size
+        if gap_limit is None:
+            gap_limit = self.get_max_read_gap()
+
+        needed : set[int] = set()
+        blocked : set[int] = set(unreadable) if unreadable else set()
+        for register in map:
+            if register.write_mode == WriteMode.READDISABLED or register.write_mode == WriteMode.WRITEONLY: ##register is disabled; skip
+                blocked.add(register.register)
+                continue
+
+            needed.add(register.register)
+            if register.data_type in (Data_Type.UINT, Data_Type.INT, Data_Type._32BIT_FLAGS): #32 bit values span two registers
+                needed.add(register.register + 1)
+
+        if unreadable:
+            needed.difference_update(unreadable)
+
+        blocked.difference_update(needed)
+        blocked_sorted : list[int] = sorted(blocked)
+
         ranges : list[tuple] = []
+        start : int = None
+        end : int = None
+        for register in sorted(needed):
+            if start is not None:
+                gap = register - end - 1
+                if (register - start < max_batch_size and gap <= gap_limit
+                    and bisect.bisect_right(blocked_sorted, end) == bisect.bisect_left(blocked_sorted, register)): #no blocked registers in the gap
+                    end = register
+                    continue
 
-        while (start := start+max_batch_size) <= max_register:
-            
-            registers : list[int] = [] #use a list, im too lazy to write logic
+                ranges.append((start, end-start+1)) ## APPENDING A TUPLE!
 
-            end = start+max_batch_size
-            for register in map:
-                if register.register >= start and register.register < end:
-                    if register.write_mode == WriteMode.READDISABLED: ##register is disabled; skip
-                        continue
-                    if register.write_mode == WriteMode.WRITEONLY: ##Write Only; skip
-                        continue
-                
-                    registers.append(register.register)
+            start = end = register
 
-            if registers: #not empty
-                ranges.append((min(registers), max(registers)-min(registers)+1)) ## APPENDING A TUPLE!
+        if start is not None:
+            ranges.append((start, end-start+1))
 
         return ranges
+
+    def get_max_read_gap(self, baud : int = None, batch_delay : float = 0) -> int:
+        ''' largest number of unused registers worth reading to save a request; from the baud rate and the per request overhead ( seconds )
+        baud; the transport's baud rate, 0 for network transports. defaults to the protocol's baud
+        batch_delay; the transport's delay between requests '''
+        request_overhead : float = 0.05 #device turnaround
+
+        try:
+            if baud is None:
+                baud = int(self.settings['baud']) if "baud" in self.settings else 9600
+            if "request_overhead" in self.settings:
+                request_overhead = float(self.settings['request_overhead'])
+        except ValueError:
+            baud = 9600 if baud is None else baud
+
+        if not baud: #network; unused registers cost next to nothing compared to another request
+            return 0xFFFF
+
+        char_time : float = 10 / baud #8N1
+        request_cost : float = request_overhead + batch_delay + (8 + 5 + 7) * char_time #request + response framing, 3.5 char silence either side
+        register_cost : float = 2 * char_time
+        return int(request_cost / register_cost)
+
     def find_protocol_file(self, file : str, base_dir : str = '' ) -> str:
 
         path = base_dir + '/' + file
@@ -782,7 +1072,110 @@ class protocol_settings:
                 size = item.register
 
         self.registry_map_size[registry_type] = size
-        self.registry_map_ranges[registry_type] = self.calculate_registry_ranges(self.registry_map[registry_type], self.registry_map_size[registry_type])
+        self.registry_map_ranges[registry_type] = self.calculate_registry_ranges(self.registry_map[registry_type])
+
+        #separate ranges per poll interval, so slow / static registers aren't read every time
+        tiers = self.get_registry_tier_maps(registry_type)
+        if len(tiers) > 1:
+            self.registry_map_tiers[registry_type] = {poll_interval : self.calculate_registry_ranges(entries) for poll_interval, entries in tiers.items()}
+        else:
+            self.registry_map_tiers[registry_type] = {poll_interval : self.registry_map_ranges[registry_type] for poll_interval in tiers}
+
+    @staticmethod
+    def parse_poll_interval(text : str) -> float:
+        ''' 1s, 500ms, 5m, 1h, once, or plain seconds; returns seconds, -1 for once '''
+        text = text.strip().lower()
+        if text == 'once':
+            return -1
+
+        multipliers : dict[str, float] = {'ms' : 0.001, 's' : 1, 'm' : 60, 'h' : 3600}
+        for suffix in ('ms', 's', 'm', 'h'): #ms before s and m
+            if text.endswith(suffix):
+                return float(text[:-len(suffix)]) * multipliers[suffix]
+
+        return float(text)
+
+    def get_registry_tier_maps(self, registry_type : Registry_Type) -> dict[float, list[registry_map_entry]]:
+        ''' poll interval -> entries '''
+        tiers : dict[float, list[registry_map_entry]] = {}
+        for entry in self.registry_map[registry_type]:
+            tiers.setdefault(entry.poll_interval, []).append(entry)
+        return tiers
+
+    def get_registry_tiers(self, registry_type : Registry_Type) -> dict[float, list[tuple]]:
+        ''' poll interval -> ranges; 0 is every read, -1 is once '''
+        return self.registry_map_tiers[registry_type]
+
+    def get_code_tables(self, code_key : str) -> tuple[dict[int, str], dict[str, str]]:
+        ''' compiled once per code table; ( value -> label, label -> code key ) '''
+        if code_key not in self._code_tables:
+            forward : dict[int, str] = {}
+            reverse : dict[str, str] = {}
+            for key, label in self.codes[code_key].items():
+                key = str(key)
+                if key.lstrip('-').isdigit() and str(int(key)) == key: #only keys that str(int(value)) can produce
+                    forward[int(key)] = label
+
+                if isinstance(label, str):
+                    reverse.setdefault(label, key) #first match wins
+
+            self._code_tables[code_key] = (forward, reverse)
+
+        return self._code_tables[code_key]
+
+    @staticmethod
+    def decode_code(forward : dict[int, str], value):
+        ''' codes match on the integer part of the value '''
+        try:
+            return forward.get(int(value), value)
+        except (ValueError, TypeError, OverflowError): #not a number
+            return value
+
+    def encode_code(self, entry : registry_map_entry, value):
+        ''' label -> code, for writing; returns value unchanged if it isn't a label '''
+        for code_key in (entry.documented_name+'_codes', entry.variable_name+'_codes'):
+            if code_key in self.codes:
+                return self.get_code_tables(code_key)[1].get(value, value)
+
+        return value
+
+    def compile_flag_codes(self, codes : dict[str, str]) -> tuple[list[tuple[int, int, str]], list[tuple[int, str]]]:
+        ''' compiles a flag code table, ie: {"b0" : "StandBy", "b0&b1" : "Operational"}
+        returns ( [(bit, bit mask, label)] sorted by bit, [(bit mask, label)] for multibit flags ) '''
+        bits : list[tuple[int, int, str]] = []
+        multibits : list[tuple[int, str]] = []
+
+        def parse_bit(key : str) -> int:
+            if key[:1] == 'b' and key[1:].isdigit() and key == 'b' + str(int(key[1:])):
+                return int(key[1:])
+            return None
+
+        for key, label in codes.items():
+            if '&' in key:
+                mask : int = 0
+                for part in key.split('&'):
+                    bit = parse_bit(part)
+                    if bit is None:
+                        mask = 0
+                        break
+                    mask |= 1 << bit
+
+                if mask:
+                    multibits.append((mask, label))
+                continue
+
+            bit = parse_bit(key)
+            if bit is not None:
+                bits.append((bit, 1 << bit, label))
+
+        bits.sort(key=lambda flag: flag[0])
+        return bits, multibits
+
+    def get_flag_codes(self, code_key : str) -> tuple[list[tuple[int, int, str]], list[tuple[int, str]]]:
+        ''' compiled once per code table; see compile_flag_codes '''
+        if code_key not in self._flag_codes:
+            self._flag_codes[code_key] = self.compile_flag_codes(self.codes[code_key])
+        return self._flag_codes[code_key]
 
     def process_register_bytes(self, registry : dict[int,bytes], entry : registry_map_entry):
         ''' process bytes into data'''
@@ -818,37 +1211,25 @@ class protocol_settings:
             #handle custom sizes, less than 1 register
             end_bit = flag_size + start_bit
             
+            flag_bits : int = int.from_bytes(register, byteorder='little') #bit i is bit i%8 of byte i//8
+            range_mask : int = ((1 << end_bit) - 1) ^ ((1 << start_bit) - 1)
+
             if entry.documented_name+'_codes' in self.codes:
-                code_key : str = entry.documented_name+'_codes'
-                flags : list[str] = []
-                flag_indexes : list[str] = []
-                for i in range(start_bit, end_bit):  # Iterate over each bit position (0 to 15)
-                    byte = i // 8 
-                    bit = i % 8
-                    val = register[byte]
-                    # Check if the i-th bit is set
-                    if (val >> bit) & 1:
-                        flag_index = "b"+str(i)
-                        flag_indexes.append(flag_index)
-                        if flag_index in self.codes[code_key]:
-                            flags.append(self.codes[code_key][flag_index])
+                bits, multibits = self.get_flag_codes(entry.documented_name+'_codes')
+                flags : list[str] = [label for bit, mask, label in bits if start_bit <= bit < end_bit and flag_bits & mask]
 
                 #check multibit flags
-                multibit_flags = [key for key in self.codes if '&' in key]
-
-                if multibit_flags: #if multibit flags are found
-                    flag_indexes_set : set[str] = set(flag_indexes)
-                    for multibit_flag in multibit_flags:
-                        bits = multibit_flag.split('&')  # Split key into 'bits'
-                        if all(bit in flag_indexes_set for bit in bits): # Check if all bits are present in the flag_indexes_set
-                            flags.append(self.codes[code_key][multibit_flag])
-                    
+                set_bits : int = flag_bits & range_mask
+                for mask, label in multibits:
+                    if set_bits & mask == mask:
+                        flags.append(label)
+
                 value = ",".join(flags)
             else:
                 flags : list[str] = []
                 for i in range(start_bit, end_bit):  # Iterate over each bit position (0 to 15)
                     # Check if the i-th bit is set
-                    if (val >> i) & 1:
+                    if (flag_bits >> i) & 1:
                         flags.append("1")
                     else:
                         flags.append("0")
@@ -902,14 +1283,7 @@ class protocol_settings:
         #apply codes
         if (entry.data_type != Data_Type._16BIT_FLAGS and
             entry.documented_name+'_codes' in self.codes):
-            try:
-                cleanval = str(int(value))
-        
-                if cleanval in self.codes[entry.documented_name+'_codes']:
-                    value = self.codes[entry.documented_name+'_codes'][cleanval]
-            except:
-                #do nothing; try is for intval
-                value = value
+            value = self.decode_code(self.get_code_tables(entry.documented_name+'_codes')[0], value)
 
         return value
 
@@ -972,18 +1346,12 @@ class protocol_settings:
             
             if entry.documented_name+'_codes' in self.codes:
                 flags : list[str] = []
-                offset : int = 0
 
                 if end_bit > 0:
                     end : int = 16 if end_bit >= 16 else end_bit
-                    for i in range(start_bit, end):  # Iterate over each bit position (0 to 15)
-                        # Check if the i-th bit is set
-                        if (val >> i) & 1:
-                            flag_index = "b"+str(i+offset)
-                            if flag_index in self.codes[entry.documented_name+'_codes']:
-                                flags.append(self.codes[entry.documented_name+'_codes'][flag_index])
+                    bits, _ = self.get_flag_codes(entry.documented_name+'_codes')
+                    flags = [label for bit, mask, label in bits if start_bit <= bit < end and val & mask]
 
-                        
                 value = ",".join(flags)
             else:
                 flags : list[str] = []
@@ -1025,60 +1393,252 @@ class protocol_settings:
 
         if (entry.data_type != Data_Type._16BIT_FLAGS and
             entry.documented_name+'_codes' in self.codes):
-            try:
-                cleanval = str(int(value))
-        
-                if cleanval in self.codes[entry.documented_name+'_codes']:
-                    value = self.codes[entry.documented_name+'_codes'][cleanval]
-            except:
-                #do nothing; try is for intval
-                value = value
-                
+            value = self.decode_code(self.get_code_tables(entry.documented_name+'_codes')[0], value)
+
         return value
 
+    def compile_register_ushort(self, entry : registry_map_entry) -> Callable[[dict[int, int]], object]:
+        ''' returns a decode function for a single entry; same results as process_register_ushort, with the data type, unit mod and codes resolved up front '''
+        register : int = entry.register
+        next_register : int = entry.register + 1
+
+        if entry.data_type == Data_Type.UINT:
+            raw = lambda registry: float((registry[register] << 16) + registry[next_register]) if next_register in registry else None
+        elif entry.data_type == Data_Type.SHORT:
+            raw = lambda registry: -(registry[register] - 0x10000 if registry[register] & 0x8000 else registry[register])
+        elif entry.data_type == Data_Type.INT:
+            def raw(registry : dict[int, int]):
+                if next_register not in registry:
+                    return None
+                value = (registry[register] << 16) + registry[next_register]
+                return -(value - 0x100000000 if value & 0x80000000 else value)
+        elif entry.data_type == Data_Type._16BIT_FLAGS and entry.unit_mod == float(1) and entry.documented_name+'_codes' in self.codes:
+            #flags with codes; keep only the bits this entry covers, see process_register_ushort
+            start_bit : int = entry.register_bit if entry.register_bit > 0 else 0
+            end_bit : int = Data_Type.getSize(entry.data_type) + start_bit
+            if entry.concatenate:
+                end_bit = end_bit - ((entry.register - entry.concatenate_registers[0]) * 16)
+            end : int = 16 if end_bit >= 16 else end_bit
+
+            bits, _ = self.get_flag_codes(entry.documented_name+'_codes')
+            flags : list[tuple[int, str]] = [(mask, label) for bit, mask, label in bits if start_bit <= bit < end]
+            return lambda registry: ",".join([label for mask, label in flags if registry[register] & mask])
+        elif entry.data_type in (Data_Type._16BIT_FLAGS, Data_Type._8BIT_FLAGS, Data_Type._32BIT_FLAGS, Data_Type.HEX, Data_Type.ASCII):
+            return lambda registry: self.process_register_ushort(registry, entry) #uncommon; not worth specializing
+        elif entry.data_type.value > 200 or entry.data_type == Data_Type.BYTE: #bit types
+            bit_mask = (1 << Data_Type.getSize(entry.data_type)) - 1
+            bit_index = entry.register_bit
+            raw = lambda registry: (registry[register] >> bit_index) & bit_mask
+        else: #default, Data_Type.USHORT
+            raw = lambda registry: float(registry[register])
+
+        unit_mod : float = entry.unit_mod
+        codes : dict[int, str] = None
+        if entry.data_type != Data_Type._16BIT_FLAGS and entry.documented_name+'_codes' in self.codes:
+            codes = self.get_code_tables(entry.documented_name+'_codes')[0]
+
+        if codes is None:
+            if unit_mod == float(1):
+                return raw
+
+            def decode(registry : dict[int, int]):
+                value = raw(registry)
+                return None if value is None else value * unit_mod
+            return decode
+
+        def decode_codes(registry : dict[int, int]):
+            value = raw(registry)
+            if value is None:
+                return None
+
+            if unit_mod != float(1):
+                value = value * unit_mod
+
+            return self.decode_code(codes, value)
+        return decode_codes
+
+    def compile_decoders(self, map : list[registry_map_entry]) -> tuple[list[tuple], list[tuple]]:
+        ''' decode plan for a registry map; (blocks, entries)
+        blocks; contiguous runs of plain numeric entries, decoded with struct; see compile_blocks
+        entries; (register, variable name, decode function, concatenate registers or None, is ascii) for everything else '''
+        blocks = self.compile_blocks(map)
+        in_block : set[int] = {id(entry) for block in blocks for entry in block[5]}
+
+        plan : list[tuple] = []
+        for entry in map:
+            if id(entry) in in_block:
+                continue
+
+            plan.append(self.compile_entry(entry))
+        return blocks, plan
+
+    def compile_entry(self, entry : registry_map_entry) -> tuple:
+        return (entry.register,
+                entry.variable_name,
+                self.compile_register_ushort(entry),
+                entry.concatenate_registers if entry.concatenate else None,
+                entry.data_type == Data_Type.ASCII)
+
+    def compile_blocks(self, map : list[registry_map_entry], min_entries : int = 4) -> list[tuple]:
+        ''' groups USHORT / SHORT / UINT / INT entries that sit back to back into blocks, so a whole block is unpacked with one struct call
+        each block is (register getter, pack, unpack, variable names, scale factors, entries) '''
+        formats : dict[Data_Type, tuple[str, int]] = { #struct format, size in registers
+            Data_Type.USHORT : ('H', 1),
+            Data_Type.SHORT : ('h', 1),
+            Data_Type.UINT : ('I', 2),
+            Data_Type.INT : ('i', 2),
+        }
+
+        columns = self.get_registry_columns(map)
+        numeric : set[int] = {data_type.value for data_type in formats}
+
+        names : dict[str, int] = {}
+        for name in columns.variable_name:
+            names[name] = names.get(name, 0) + 1
+
+        candidates : list[registry_map_entry] = []
+        for i in sorted(range(len(columns)), key=columns.register.__getitem__):
+            if (columns.data_type[i] not in numeric or columns.concatenate[i]
+                or names[columns.variable_name[i]] > 1 #duplicate names; keep the per entry order, last one wins
+                or map[i].documented_name+'_codes' in self.codes):
+                continue
+            candidates.append(map[i])
+
+        runs : list[list[registry_map_entry]] = []
+        run : list[registry_map_entry] = []
+        next_register : int = None
+        for entry in candidates:
+            if entry.register != next_register:
+                if len(run) >= min_entries:
+                    runs.append(run)
+                run = []
+            run.append(entry)
+            next_register = entry.register + formats[entry.data_type][1]
+        if len(run) >= min_entries:
+            runs.append(run)
+
+        blocks : list[tuple] = []
+        for run in runs:
+            start = run[0].register
+            end = run[-1].register + formats[run[-1].data_type][1]
+
+            factors : list = []
+            for entry in run:
+                if entry.data_type in (Data_Type.SHORT, Data_Type.INT): #signed values are negated; matches process_register_ushort
+                    factors.append(-1 if entry.unit_mod == float(1) else -entry.unit_mod)
+                else: #unsigned values are floats
+                    factors.append(float(entry.unit_mod))
+
+            blocks.append((operator.itemgetter(*range(start, end)),
+                           struct.Struct('>' + str(end - start) + 'H'),
+                           struct.Struct('>' + ''.join(formats[entry.data_type][0] for entry in run)),
+                           [entry.variable_name for entry in run],
+                           factors,
+                           run))
+
+        return blocks
+
+    def get_registry_columns(self, map : list[registry_map_entry]) -> registry_map_columns:
+        ''' column view of a map; built on first use '''
+        cached = self._columns.get(id(map))
+        if cached is not None and cached.entries is map and len(cached) == len(map):
+            return cached
+
+        columns = registry_map_columns(map)
+        self._columns[id(map)] = columns
+        return columns
+
+    def get_decoders(self, map : list[registry_map_entry]) -> tuple[list[tuple], list[tuple]]:
+        ''' compiled once per map; recompiled if the map was modified '''
+        cached = self._decoders.get(id(map))
+        if cached is not None and cached[0] is map and cached[1] == len(map):
+            return cached[2]
+
+        plan = self.compile_decoders(map)
+        self._decoders[id(map)] = (map, len(map), plan) #keep a reference, so the id isn't reused
+        return plan
+
     def process_registery(self, registry : Union[dict[int, int], dict[int, bytes]] , map : list[registry_map_entry]) -> dict[str,str]:
         '''process registry into appropriate datatypes and names -- maybe add func for single entry later?'''
-        
+
+        if not registry:
+            return {}
+
+        if isinstance(next(iter(registry.values())), bytes):
+            return self.process_registery_bytes(registry, map)
+
+        blocks, plan = self.get_decoders(map)
+
         concatenate_registry : dict = {}
         info = {}
-        for entry in map:
+        for getter, pack, unpack, names, factors, entries in blocks:
+            try:
+                values = unpack.unpack(pack.pack(*getter(registry)))
+            except (KeyError, struct.error): #part of the block wasn't read, or isn't a 16 bit value
+                for entry in entries:
+                    if entry.register in registry:
+                        info[entry.variable_name] = self.process_register_ushort(registry, entry)
+                continue
 
-            if entry.register not in registry:
+            info.update(zip(names, [value * factor for value, factor in zip(values, factors)]))
+
+        for register, variable_name, decode, concatenate_registers, is_ascii in plan:
+
+            if register not in registry:
                 continue
-            value = ''    
 
-            if isinstance(registry[entry.register], bytes):
-                value = self.process_register_bytes(registry, entry)
-            else:
-                value = self.process_register_ushort(registry, entry)
-            
+            value = decode(registry)
+
             #if item.unit:
             #    value = str(value) + item.unit
+            if concatenate_registers is not None:
+                concatenate_registry[register] = value
+                info_value = self.concatenate_value(concatenate_registry, concatenate_registers, is_ascii)
+                if info_value is not None:
+                    info[variable_name] = info_value
+            else:
+                info[variable_name] = value
+
+        return info
+
+    def process_registery_bytes(self, registry : dict[int, bytes], map : list[registry_map_entry]) -> dict[str,str]:
+        ''' process_registery for byte registries, ie: canbus '''
+        concatenate_registry : dict = {}
+        info = {}
+        for entry in map:
+
+            if entry.register not in registry:
+                continue
+
+            value = self.process_register_bytes(registry, entry)
+
             if entry.concatenate:
                 concatenate_registry[entry.register] = value
-
-                all_exist = True
-                for key in entry.concatenate_registers:
-                    if key not in concatenate_registry:
-                        all_exist = False
-                        break
-                if all_exist:
-                #if all(key in concatenate_registry for key in item.concatenate_registers):
-                    concatenated_value = ""
-                    for key in entry.concatenate_registers:
-                        concatenated_value = concatenated_value + str(concatenate_registry[key])
-                        del concatenate_registry[key]
-
-                    #replace null characters with spaces and trim
-                    if entry.data_type == Data_Type.ASCII:
-                        concatenated_value = concatenated_value.replace("\x00", " ").strip()
-
-                    info[entry.variable_name] = concatenated_value
+                info_value = self.concatenate_value(concatenate_registry, entry.concatenate_registers, entry.data_type == Data_Type.ASCII)
+                if info_value is not None:
+                    info[entry.variable_name] = info_value
             else:
                 info[entry.variable_name] = value
 
         return info
 
+    def concatenate_value(self, concatenate_registry : dict, concatenate_registers : list[int], is_ascii : bool) -> str:
+        ''' returns the concatenated value once every register is present, otherwise None '''
+        for key in concatenate_registers:
+            if key not in concatenate_registry:
+                return None
+
+        concatenated_value = ""
+        for key in concatenate_registers:
+            concatenated_value = concatenated_value + str(concatenate_registry[key])
+            del concatenate_registry[key]
+
+        #replace null characters with spaces and trim
+        if is_ascii:
+            concatenated_value = concatenated_value.replace("\x00", " ").strip()
+
+        return concatenated_value
+
     def validate_registry_entry(self, entry : registry_map_entry, val) -> int:
             #if code, validate first. 
             if entry.documented_name+'_codes' in self.codes:
@@ -0,0 +1,74 @@
+import heapq
+import itertools
+import time
+
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from classes.transports.transport_base import transport_base
+
+
+class transport_scheduler:
+    ''' deadline scheduler; keeps a priority queue of when each transport is next due to be read '''
+
+    idle_sleep : float = 7
+    ''' seconds to sleep when nothing is scheduled ( passive transports only ) '''
+
+    _queue : list[tuple[float, int, 'transport_base']]
+    ''' heap of (due time, insertion order, transport) '''
+
+    _counter : itertools.count
+    ''' tie breaker, so transports themselves are never compared '''
+
+    def __init__(self, transports : list['transport_base'] = None):
+        self._queue = []
+        self._counter = itertools.count()
+
+        if transports:
+            for transport in transports:
+                self.add(transport)
+
+    def add(self, transport : 'transport_base', due : float = None):
+        ''' schedule transport; transports without a read_interval are passive and are not scheduled '''
+        if transport.read_interval <= 0:
+            return
+
+        if due is None:
+            due = time.monotonic()
+
+        heapq.heappush(self._queue, (due, next(self._counter), transport))
+
+    def next_due(self) -> float:
+        ''' monotonic time of the earliest deadline, None if nothing is scheduled '''
+        if not self._queue:
+            return None
+
+        return self._queue[0][0]
+
+    def pop_due(self, now : float = None) -> list[tuple['transport_base', float]]:
+        ''' pops every transport that is due and schedules its next read.
+        returns list of (transport, due time); lateness is measured against due when each read starts, since the batch is read one after another '''
+        if now is None:
+            now = time.monotonic()
+
+        due_transports : list[tuple['transport_base', float]] = []
+        while self._queue and self._queue[0][0] <= now:
+            due, _, transport = heapq.heappop(self._queue)
+            due_transports.append((transport, due))
+
+            #keep the schedule on its original grid; skip deadlines that were missed entirely
+            interval = transport.read_interval
+            missed = int((now - due) // interval) + 1
+            self.add(transport, due + (missed * interval))
+
+        return due_transports
+
+    def sleep(self):
+        ''' sleep until the earliest deadline '''
+        due = self.next_due()
+        if due is None:
+            time.sleep(self.idle_sleep)
+            return
+
+        delay = due - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
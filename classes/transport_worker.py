@@ -0,0 +1,51 @@
+import queue
+import threading
+import time
+
+from classes.transport_scheduler import transport_scheduler
+
+from typing import Callable
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from classes.transports.transport_base import transport_base
+
+
+class transport_worker(threading.Thread):
+    ''' reads every transport on one physical bus in its own thread; results are handed off through a thread safe queue '''
+
+    bus_id : str
+    transports : list['transport_base']
+
+    read : Callable[['transport_base', float], list[tuple['transport_base', dict[str, str]]]]
+    ''' read callback (transport, due time); returns (device, info) to bridge '''
+
+    results : queue.Queue
+    ''' queue of (transport, device, info) to be bridged by the main thread '''
+
+    _stop_event : threading.Event
+
+    def __init__(self, bus_id : str, transports : list['transport_base'], read : Callable[['transport_base', float], list[tuple['transport_base', dict[str, str]]]], results : queue.Queue):
+        super().__init__(name="worker[" + bus_id + "]", daemon=True)
+        self.bus_id = bus_id
+        self.transports = transports
+        self.read = read
+        self.results = results
+        self._stop_event = threading.Event()
+
+    def run(self):
+        scheduler = transport_scheduler(self.transports)
+
+        while not self._stop_event.is_set():
+            for transport, due in scheduler.pop_due():
+                for device, info in self.read(transport, due):
+                    if info:
+                        self.results.put((transport, device, info))
+
+            due = scheduler.next_due()
+            if due is None: #nothing to read on this bus
+                return
+
+            self._stop_event.wait(max(0, due - time.monotonic())) #sleep; wakes early on stop
+
+    def stop(self):
+        self._stop_event.set()
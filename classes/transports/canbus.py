@@ -259,13 +259,8 @@ class canbus(transport_base):
         if variable_name:
             variable_name = variable_name.strip().lower().replace(' ', '_')
 
-        registry_map = self.protocolSettings.get_registry_map(registry_type)
-
         if entry == None:
-            for e in registry_map:
-                if e.variable_name == variable_name:
-                    entry = e
-                    break
+            entry = self.protocolSettings.get_variable_entry(variable_name, registry_type)
 
         if entry:
             #no concat for canbus or concat on todo
@@ -1,3 +1,4 @@
+import asyncio
 import glob
 import json
 import os
@@ -6,9 +7,12 @@ import time
 from pymodbus.exceptions import ModbusIOException
 
 from .transport_base import transport_base
+from ..circuit_breaker import circuit_breaker, Breaker_State
+from ..bus_arbiter import bus_arbiter
 from ..protocol_settings import Data_Type, Registry_Type, registry_map_entry, protocol_settings
 from defs.common import strtobool
 
+from typing import Generator
 from typing import TYPE_CHECKING
 if TYPE_CHECKING:
     from configparser import SectionProxy
@@ -18,6 +22,59 @@ if TYPE_CHECKING:
         from pymodbus.client import BaseModbusClient
 
 
+class modbus_pacing:
+    ''' adaptive delay between requests; shrinks toward the minimum safe gap while the device answers, backs off multiplicatively on errors / timeouts '''
+
+    baudrate : int = 0
+    ''' rtu baud rate; 0 for network transports, which have no silent interval '''
+
+    delay : float = 0.85
+    ''' current pace; seconds between requests '''
+
+    latency : float = 0
+    ''' smoothed response time ( ewma ), seconds '''
+
+    max_delay : float = 60
+    smoothing : float = 0.2
+    ''' ewma weight of the newest response time '''
+    decay : float = 0.5
+    ''' on success, the distance to the floor shrinks by this factor '''
+    backoff : float = 2
+    ''' on error, the delay grows by this factor '''
+
+    #counters
+    requests : int = 0
+    errors : int = 0
+
+    def __init__(self, delay : float = 0.85, baudrate : int = 0):
+        self.delay = delay
+        self.baudrate = baudrate
+
+    @property
+    def floor(self) -> float:
+        ''' rtu 3.5 character silent interval; fixed at 1.75ms above 19200 baud, per the modbus serial line spec '''
+        if not self.baudrate:
+            return 0
+        if self.baudrate > 19200:
+            return 0.00175
+        return 3.5 * 11 / self.baudrate #11 bits per character
+
+    def success(self, latency : float):
+        self.requests += 1
+        self.latency = latency if not self.latency else self.latency + (latency - self.latency) * self.smoothing
+        floor = self.floor
+        self.delay = max(floor, floor + (self.delay - floor) * self.decay)
+
+    def failure(self):
+        self.requests += 1
+        self.errors += 1
+        self.delay = min(self.max_delay, max(self.delay, self.latency, self.floor, 0.01) * self.backoff)
+
+    def stats(self) -> str:
+        return ("pace: " + str(round(self.delay * 1000, 1)) + "ms latency: " + str(round(self.latency * 1000, 1)) + "ms floor: " + str(round(self.floor * 1000, 2))
+                + "ms requests: " + str(self.requests) + " errors: " + str(self.errors))
+
+
 class modbus_base(transport_base):
 
 
@@ -35,6 +92,36 @@ class modbus_base(transport_base):
     modbus_delay : float = 0.85
     '''time inbetween requests'''
 
+    breaker_threshold : int = 3
+    ''' consecutive failed reads before a range's circuit breaker opens; the device's breaker opens after twice as many '''
+
+    breaker_cool_down : float = 60
+    ''' seconds an open circuit breaker skips reads before probing again '''
+
+    device_breaker : circuit_breaker = None
+    ''' skips every read while the device is not answering '''
+
+    range_breakers : dict[tuple[Registry_Type, int, int], circuit_breaker]
+    ''' (registry type, start, count) -> breaker '''
+
+    pipeline_window : int = 1
+    ''' transports that can pipeline ( modbus_tcp ) send this many reads before waiting for the replies; 1 disables pipelining '''
+
+    _prefetched : dict[tuple[int, int, Registry_Type], object]
+    ''' (start, count, registry type) -> response; read by prefetch_registers, consumed by read_registers '''
+
+    arbiter : bus_arbiter = None
+    ''' serializes requests on a shared bus; see modbus_rtu '''
+
+    devices : list['modbus_base'] = None
+    ''' one transport per device when several devices share this transport, ie: modbus_rtu addresses; None for a single device '''
+
+    baudrate : int = 0
+    ''' serial baud rate; 0 for network transports, see modbus_rtu '''
+
+    pacing : modbus_pacing = None
+    ''' adaptive_delay; replaces the fixed modbus_delay steps when enabled '''
+
     analyze_protocol_enabled : bool = False
     analyze_protocol_save_load : bool = False
     first_connect : bool = True
@@ -42,6 +129,30 @@ class modbus_base(transport_base):
     send_holding_register : bool = True
     send_input_register : bool = True
 
+    state_dir : str = '.state'
+    ''' learned per device state, such as unreadable registers, is saved here '''
+
+    unreadable_registers : dict[Registry_Type, set[int]]
+    ''' registers that returned illegal address ( exception 02 ); learned by splitting failed reads '''
+
+    _read_ranges : dict[tuple[Registry_Type, tuple[float, ...]], list[tuple]]
+    ''' (registry type, poll intervals) -> ranges planned around unreadable_registers '''
+
+    tier_base_interval : float = 0
+    ''' read_interval from settings; registers without a poll interval are read this often '''
+
+    _last_tier_reads : dict[tuple[Registry_Type, float], float]
+    ''' (registry type, poll interval) -> monotonic time of the last read '''
+
+    holding_refresh_interval : float = 0
+    ''' seconds; when set, holding registers are read from the bus this often and served from holding_cache in between. 0 reads them every time '''
+
+    holding_cache : dict[int, int]
+    ''' shadow copy of the holding registers; updated by reads and successful writes '''
+
+    _holding_read_time : float = 0
+    ''' monotonic time holding registers were last read from the bus by read_data '''
+
     def __init__(self, settings : 'SectionProxy', protocolSettings : 'protocol_settings' = None):
         super().__init__(settings, protocolSettings=protocolSettings)
 
@@ -65,12 +176,42 @@ class modbus_base(transport_base):
         self.modbus_delay = settings.getfloat(['batch_delay', 'modbus_delay'], fallback=self.modbus_delay)
         self.modbus_delay_setting = self.modbus_delay
 
+        self.breaker_threshold = settings.getint('breaker_threshold', fallback=self.breaker_threshold)
+        self.breaker_cool_down = settings.getfloat('breaker_cool_down', fallback=self.breaker_cool_down)
+
+        if settings.getboolean('adaptive_delay', fallback=False):
+            self.pacing = modbus_pacing(self.modbus_delay)
+
+        self.state_dir = settings.get('state_dir', fallback=self.state_dir)
+        self.holding_refresh_interval = settings.getfloat('holding_refresh_interval', fallback=self.holding_refresh_interval)
+        self.init_device_state()
+
+        #poll tiers; read as often as the fastest tier, other tiers are read when due
+        self.tier_base_interval = self.read_interval
+        fastest : float = min((poll_interval for registry_type in (Registry_Type.INPUT, Registry_Type.HOLDING)
+                               for poll_interval in self.protocolSettings.get_registry_tiers(registry_type) if poll_interval > 0), default=0)
+        if self.read_interval > 0 and 0 < fastest < self.read_interval:
+            self.read_interval = fastest
+
 
         if self.analyze_protocol_enabled:
             self.connect()
             self.analyze_protocol()
             quit()
 
+    def init_device_state(self):
+        ''' state learned from the device; each device on a shared transport gets its own, see modbus_rtu addresses '''
+        self.device_breaker = circuit_breaker(self.transport_name, self.breaker_threshold * 2, self.breaker_cool_down)
+        self.range_breakers = {}
+        self.unreadable_registers = {}
+        self._read_ranges = {}
+        self.holding_cache = {}
+        self._holding_read_time = 0
+        self._last_tier_reads = {}
+        self._prefetched = {}
+        if self.pacing:
+            self.pacing = modbus_pacing(self.pacing.delay, self.pacing.baudrate)
+
     def init_after_connect(self):
         #from transport_base settings
         if self.write_enabled:
@@ -81,6 +222,96 @@ class modbus_base(transport_base):
             self.device_serial_number = self.read_serial_number()
             self.update_identifier()
 
+        self.load_unreadable_registers()
+
+    def get_state_path(self) -> str:
+        identifier = self.device_identifier if self.device_identifier else self.transport_name
+        identifier = re.sub(r'[^\w\-.]', '_', identifier)
+        return os.path.join(self.state_dir, self.protocolSettings.protocol + '.' + identifier + '.json')
+
+    def load_unreadable_registers(self):
+        ''' skip probing; load the unreadable registers learned on a previous run '''
+        path = self.get_state_path()
+        if not self.state_dir or not os.path.exists(path):
+            return
+
+        try:
+            with open(path) as f:
+                state = json.load(f)
+        except (OSError, ValueError) as err:
+            self._log.warning("unable to load state: " + path + " : " + str(err))
+            return
+
+        for name, registers in state.get('unreadable_registers', {}).items():
+            registry_type = Registry_Type[name.upper()]
+            self.unreadable_registers.setdefault(registry_type, set()).update(registers)
+            self._read_ranges.clear()
+
+        self._log.info("loaded unreadable registers: " + path)
+
+    def save_unreadable_registers(self):
+        if not self.state_dir:
+            return
+
+        path = self.get_state_path()
+        state = {'unreadable_registers' : {registry_type.name.lower() : sorted(registers) for registry_type, registers in self.unreadable_registers.items()}}
+        try:
+            os.makedirs(self.state_dir, exist_ok=True)
+            with open(path, 'w') as f:
+                json.dump(state, f, indent=4)
+        except OSError as err:
+            self._log.warning("unable to save state: " + path + " : " + str(err))
+
+    def get_read_ranges(self, registry_type : Registry_Type, poll_intervals : tuple[float, ...] = None) -> list[tuple]:
+        ''' protocol ranges, re-planned for this transport's bus and around registers this device can't read
+        poll_intervals; only read these tiers, see get_due_poll_intervals. None for all '''
+        key = (registry_type, poll_intervals)
+        if key not in self._read_ranges:
+            entries = self.protocolSettings.get_registry_map(registry_type)
+            if poll_intervals is not None:
+                entries = [entry for entry in entries if entry.poll_interval in poll_intervals]
+
+            self._read_ranges[key] = self.protocolSettings.calculate_registry_ranges(entries, unreadable=self.unreadable_registers.get(registry_type),
+                                                                                     gap_limit=self.get_max_read_gap())
+
+        return self._read_ranges[key]
+
+    def get_max_read_gap(self) -> int:
+        ''' see protocol_settings.get_max_read_gap; from this transport's baud rate and batch_delay '''
+        batch_delay : float = 0 if self.pacing else self.modbus_delay_setting #adaptive delay shrinks toward nothing
+        return self.protocolSettings.get_max_read_gap(self.baudrate, batch_delay)
+
+    def get_due_poll_intervals(self, registry_type : Registry_Type, now : float = None) -> tuple[float, ...]:
+        ''' poll tiers due to be read, and marks them read. None if every tier is due.
+        single tier maps are tracked too; read_interval may have been lowered for another registry type's faster tier '''
+        tiers = self.protocolSettings.get_registry_tiers(registry_type)
+        if not tiers:
+            return None
+
+        if now is None:
+            now = time.monotonic()
+
+        tolerance : float = self.read_interval / 2 #reads happen on read_interval ticks; don't skip a tick for being a few ms early
+
+        due : list[float] = []
+        for poll_interval in tiers:
+            last_read = self._last_tier_reads.get((registry_type, poll_interval))
+            if poll_interval < 0: #once
+                if last_read is not None:
+                    continue
+            elif last_read is not None:
+                interval = poll_interval if poll_interval > 0 else self.tier_base_interval
+                if now - last_read < interval - tolerance:
+                    continue
+
+            due.append(poll_interval)
+            self._last_tier_reads[(registry_type, poll_interval)] = now
+
+        if len(due) == len(tiers):
+            return None
+
+        return tuple(sorted(due))
+
     def connect(self):
         if self.connected and self.first_connect:
             self.first_connect = False
@@ -133,17 +364,37 @@ class modbus_base(transport_base):
         if not self.write_enabled:
             return
 
-        registry_map = self.protocolSettings.get_registry_map(Registry_Type.HOLDING)
-
         for key, value in data.items():
-            for entry in registry_map:
-                if entry.variable_name == key:
-                    self.write_variable(entry, value, Registry_Type.HOLDING)
-                    break
+            entry = self.protocolSettings.get_variable_entry(key, Registry_Type.HOLDING)
+            if entry:
+                self.write_variable(entry, value, Registry_Type.HOLDING)
 
         time.sleep(self.modbus_delay) #sleep inbetween requests so modbus can rest
 
     def read_data(self) -> dict[str, str]:
+        return self.run_read_steps(self.read_data_steps())
+
+    def get_devices(self) -> list[transport_base]:
+        return self.devices if self.devices else [self]
+
+    def read_devices(self) -> list[tuple[transport_base, dict[str, str]]]:
+        if not self.devices:
+            return super().read_devices()
+
+        #interleave the devices' requests on the bus
+        return list(zip(self.devices, self.run_read_steps_interleaved([(device, device.read_data_steps()) for device in self.devices])))
+
+    async def read_devices_async(self) -> list[tuple[transport_base, dict[str, str]]]:
+        if not self.devices:
+            return await super().read_devices_async()
+
+        return list(zip(self.devices, await self.run_read_steps_interleaved_async([(device, device.read_data_steps()) for device in self.devices])))
+
+    async def read_data_async(self) -> dict[str, str]:
+        return await self.run_read_steps_async(self.read_data_steps())
+
+    def read_data_steps(self):
+        ''' read_data as read steps; see run_read_steps '''
         info = {}
         #modbus - only read input/holding registries
         for registry_type in (Registry_Type.INPUT, Registry_Type.HOLDING):
@@ -155,7 +406,19 @@ class modbus_base(transport_base):
             if registry_type == Registry_Type.HOLDING and not self.send_holding_register:
                 continue
 
-            registry = self.read_modbus_registers(ranges=self.protocolSettings.get_registry_ranges(registry_type=registry_type), registry_type=registry_type)
+            if (registry_type == Registry_Type.HOLDING and self.holding_refresh_interval > 0 and self.holding_cache
+                and time.monotonic() - self._holding_read_time < self.holding_refresh_interval):
+                registry = self.holding_cache #not due; serve the shadow copy
+            else:
+                if registry_type == Registry_Type.HOLDING:
+                    self._holding_read_time = time.monotonic()
+
+                ranges = self.get_read_ranges(registry_type, self.get_due_poll_intervals(registry_type))
+                if not ranges: #no tiers due
+                    continue
+
+                registry = yield from self.read_modbus_registers_steps(ranges=ranges, registry_type=registry_type)
+
             new_info = self.protocolSettings.process_registery(registry, self.protocolSettings.get_registry_map(registry_type))
 
             if False:
@@ -166,6 +429,12 @@ class modbus_base(transport_base):
         if not info:
             self._log.info("Register is Empty; transport busy?")
 
+        if self.pacing:
+            self._log.info("pacing; " + self.pacing.stats())
+
+        if self.arbiter:
+            self._log.info(self.arbiter.stats())
+
         return info
 
     def validate_protocol(self, protocolSettings : 'protocol_settings') -> float:
@@ -349,10 +618,13 @@ class modbus_base(transport_base):
     def write_variable(self, entry : registry_map_entry, value : str, registry_type : Registry_Type = Registry_Type.HOLDING):
         """ writes a value to a ModBus register; todo: registry_type to handle other write functions"""
 
-        #read current value
-        current_registers = self.read_modbus_registers(start=entry.register, end=entry.register, registry_type=registry_type)
-        results = self.protocolSettings.process_registery(current_registers, self.protocolSettings.get_registry_map(registry_type))
-        current_value = current_registers[entry.register]
+        #read current value; from the shadow copy while it is fresh
+        if (registry_type == Registry_Type.HOLDING and self.holding_refresh_interval > 0 and entry.register in self.holding_cache
+            and time.monotonic() - self._holding_read_time < self.holding_refresh_interval):
+            current_value = self.holding_cache[entry.register]
+        else:
+            current_registers = self.read_modbus_registers(start=entry.register, end=entry.register, registry_type=registry_type)
+            current_value = current_registers[entry.register]
 
       
         if not self.protocolSettings.validate_registry_entry(entry, current_value):
@@ -361,13 +633,8 @@ class modbus_base(transport_base):
         if not self.protocolSettings.validate_registry_entry(entry, value):
             raise ValueError("Invalid new value. unsafe to write")
         
-        #handle codes
-        if entry.variable_name+"_codes" in self.protocolSettings.codes:
-            codes = self.protocolSettings.codes[entry.variable_name+"_codes"]
-            for key, val in codes.items():
-                if val == value: #convert "string" to key value
-                    value = key
-                    break
+        #handle codes; convert "string" to key value
+        value = self.protocolSettings.encode_code(entry, value)
 
         #results[entry.variable_name]
         ushortValue : int = None #ushort
@@ -403,7 +670,14 @@ class modbus_base(transport_base):
         if ushortValue == None:
             raise ValueError("Invalid value - None")
 
-        self.write_register(entry.register, ushortValue, registry_type=registry_type)
+        response = self.write_register(entry.register, ushortValue, registry_type=registry_type)
+
+        if registry_type == Registry_Type.HOLDING: #write through; only what the device confirmed
+            if response is None or isinstance(response, bytes) or response.isError():
+                self._log.error("write failed: " + str(entry.register) + " : " + str(response))
+                self.holding_cache.pop(entry.register, None)
+            else:
+                self.holding_cache[entry.register] = ushortValue
 
 
     def read_variable(self, variable_name : str, registry_type : Registry_Type, entry : registry_map_entry = None):
@@ -414,10 +688,7 @@ class modbus_base(transport_base):
         registry_map = self.protocolSettings.get_registry_map(registry_type)
 
         if entry == None:
-            for e in registry_map:
-                if e.variable_name == variable_name:
-                    entry = e
-                    break
+            entry = self.protocolSettings.get_variable_entry(variable_name, registry_type)
 
         if entry:
             start : int = 0
@@ -435,6 +706,140 @@ class modbus_base(transport_base):
     
     def read_modbus_registers(self, ranges : list[tuple] = None, start : int = 0, end : int = None, batch_size : int = 45, registry_type : Registry_Type = Registry_Type.INPUT ) -> dict:
         ''' maybe move this to transport_base ?'''
+        return self.run_read_steps(self.read_modbus_registers_steps(ranges, start, end, batch_size, registry_type))
+
+    async def read_modbus_registers_async(self, ranges : list[tuple] = None, start : int = 0, end : int = None, batch_size : int = 45, registry_type : Registry_Type = Registry_Type.INPUT ) -> dict:
+        return await self.run_read_steps_async(self.read_modbus_registers_steps(ranges, start, end, batch_size, registry_type))
+
+    def prefetch_registers(self, requests : list[tuple[int, int, Registry_Type]]):
+        ''' sends the upcoming reads ahead of time; responses are kept in _prefetched. only transports that can pipeline implement this '''
+        pass
+
+    def run_read_steps_interleaved(self, steps : list[tuple['modbus_base', Generator]]) -> list:
+        ''' drives the read steps of several devices on one bus, one request from each in turn; returns their results in order. see run_read_steps '''
+        results : list = [None] * len(steps)
+        pending : list = [(index, device, generator, None, None) for index, (device, generator) in enumerate(steps)] #index, device, generator, response, error
+        while pending:
+            index, device, generator, response, error = pending.pop(0)
+            while True:
+                try:
+                    step = generator.throw(error) if error else generator.send(response)
+                except StopIteration as stop:
+                    results[index] = stop.value
+                    break
+
+                response = None
+                error = None
+
+                if step[0] == "sleep":
+                    time.sleep(step[1])
+                    continue
+
+                if step[0] == "prefetch":
+                    device.prefetch_registers(step[1])
+                    continue
+
+                try:
+                    response = device.read_registers(step[1], step[2], registry_type=step[3])
+                except Exception as e:
+                    error = e
+
+                pending.append((index, device, generator, response, error)) #next device's turn
+                break
+
+        return results
+
+    async def run_read_steps_interleaved_async(self, steps : list[tuple['modbus_base', Generator]]) -> list:
+        ''' asyncio version of run_read_steps_interleaved '''
+        results : list = [None] * len(steps)
+        pending : list = [(index, device, generator, None, None) for index, (device, generator) in enumerate(steps)]
+        while pending:
+            index, device, generator, response, error = pending.pop(0)
+            while True:
+                try:
+                    step = generator.throw(error) if error else generator.send(response)
+                except StopIteration as stop:
+                    results[index] = stop.value
+                    break
+
+                response = None
+                error = None
+
+                if step[0] == "sleep":
+                    await asyncio.sleep(step[1])
+                    continue
+
+                if step[0] == "prefetch":
+                    await asyncio.to_thread(device.prefetch_registers, step[1])
+                    continue
+
+                try:
+                    response = await device.read_registers_async(step[1], step[2], registry_type=step[3])
+                except Exception as e:
+                    error = e
+
+                pending.append((index, device, generator, response, error))
+                break
+
+        return results
+
+    def run_read_steps(self, steps : Generator) -> dict:
+        ''' drives read steps with blocking io.
+        read steps are generators that yield the io they need instead of doing it, so the same logic serves both the blocking and asyncio engines:
+        ("sleep", seconds) or ("read", start, count, registry_type); the read response ( or exception ) is sent back into the generator.
+        ("prefetch", [(start, count, registry_type)]) lets transports that can pipeline send the upcoming reads at once; see prefetch_registers '''
+        response = None
+        error : Exception = None
+        while True:
+            try:
+                step = steps.throw(error) if error else steps.send(response)
+            except StopIteration as stop:
+                return stop.value
+
+            response = None
+            error = None
+
+            if step[0] == "sleep":
+                time.sleep(step[1])
+                continue
+
+            if step[0] == "prefetch":
+                self.prefetch_registers(step[1])
+                continue
+
+            try:
+                response = self.read_registers(step[1], step[2], registry_type=step[3])
+            except Exception as e:
+                error = e
+
+    async def run_read_steps_async(self, steps : Generator) -> dict:
+        ''' drives read steps with asyncio; see run_read_steps '''
+        response = None
+        error : Exception = None
+        while True:
+            try:
+                step = steps.throw(error) if error else steps.send(response)
+            except StopIteration as stop:
+                return stop.value
+
+            response = None
+            error = None
+
+            if step[0] == "sleep":
+                await asyncio.sleep(step[1])
+                continue
+
+            if step[0] == "prefetch":
+                await asyncio.to_thread(self.prefetch_registers, step[1])
+                continue
+
+            try:
+                response = await self.read_registers_async(step[1], step[2], registry_type=step[3])
+            except Exception as e:
+                error = e
+
+    def read_modbus_registers_steps(self, ranges : list[tuple] = None, start : int = 0, end : int = None, batch_size : int = 45, registry_type : Registry_Type = Registry_Type.INPUT ):
+        ''' read_modbus_registers as read steps; see run_read_steps '''
 
         if not ranges: #ranges is empty, use min max
             if start == 0 and end == None:
@@ -449,66 +854,116 @@ class modbus_base(transport_base):
                     count = end - start + 1
                 ranges.append((start, count)) ##APPEND TUPLE
 
+        ranges = list(ranges) #failed ranges are split in place
+        learned : set[int] = set()
+
         registry : dict[int,] = {}
-        retries = 7
-        retry = 0
-        total_retries = 0
+
+        pipelined : bool = self.pipeline_window > 1 and len(ranges) > 1
+        if pipelined and self.device_breaker.state == Breaker_State.CLOSED:
+            yield ("prefetch", [(start, count, registry_type) for start, count in ranges
+                                if (registry_type, start, count) not in self.range_breakers or self.range_breakers[(registry_type, start, count)].state == Breaker_State.CLOSED])
 
         index = -1
         while (index := index + 1) < len(ranges) :
             range = ranges[index]
 
+            if not self.device_breaker.allow():
+                self._log.info("device not answering; skipped reads. " + self.device_breaker.stats())
+                break
+
+            key = (registry_type, range[0], range[1])
+            breaker = self.range_breakers.get(key)
+            if breaker is None:
+                breaker = self.range_breakers[key] = circuit_breaker(str(registry_type) + " - " + str(range[0]) + " (" + str(range[1]) + ")", self.breaker_threshold, self.breaker_cool_down)
+
+            if not breaker.allow():
+                continue
+
             self._log.info("get registers ("+str(index)+"): " +str(registry_type)+ " - " + str(range[0]) + " to " + str(range[0]+range[1]-1) + " ("+str(range[1])+")")
-            time.sleep(self.modbus_delay) #sleep for 1ms to give bus a rest #manual recommends 1s between commands
+            if (range[0], range[1], registry_type) not in self._prefetched: #prefetched reads were already sent; anything else ( retries, splits, a failed pipeline ) rests the bus
+                yield ("sleep", self.modbus_delay) #sleep for 1ms to give bus a rest #manual recommends 1s between commands
 
             isError = False
+            register = None
+            request_time = time.perf_counter()
             try:
-                register = self.read_registers(range[0], range[1], registry_type=registry_type)
+                register = yield ("read", range[0], range[1], registry_type)
 
             except ModbusIOException as e: 
-                self._log.error("ModbusIOException : ", e.error_code)
+                self._log.error("ModbusIOException : " + str(e))
                 if e.error_code == 4: #if no response; probably time out. retry with increased delay
                     isError = True
                 else:
                     isError = True #other erorrs. ie Failed to connect[ModbusSerialClient(rtu baud[9600])]
 
 
-            if isinstance(register, bytes) or register.isError() or isError: #sometimes weird errors are handled incorrectly and response is a ascii error string
+            if not isError and getattr(register, 'exception_code', None) == 2: #illegal address; the range covers a register the device doesn't have
+                self.device_breaker.success() #the device answered
+                breaker.success()
+                if range[1] > 1: #split, until the unreadable registers are found
+                    half = range[1] // 2
+                    ranges[index:index+1] = [(range[0], half), (range[0] + half, range[1] - half)]
+                    index = index - 1
+                else:
+                    self._log.warning("unreadable register: " + str(registry_type) + " - " + str(range[0]))
+                    learned.add(range[0])
+                continue
+
+            if isError or isinstance(register, bytes) or register.isError(): #sometimes weird errors are handled incorrectly and response is a ascii error string
                 if isinstance(register, bytes):
                     self._log.error(register.decode('utf-8'))
                 else: 
                     self._log.error(register.__str__)
-                self.modbus_delay += self.modbus_delay_increament #increase delay, error is likely due to modbus being busy
+                if self.pacing:
+                    self.pacing.failure()
+                    self.modbus_delay = self.pacing.delay
+                else:
+                    self.modbus_delay += self.modbus_delay_increament #increase delay, error is likely due to modbus being busy
 
                 if self.modbus_delay > 60: #max delay. 60 seconds between requests should be way over kill if it happens
                     self.modbus_delay = 60
 
-                if retry > retries: #instead of none, attempt to continue to read. but with no retires. 
-                    continue
-                else:
+                if self.device_breaker.failure():
+                    self._log.warning("device not answering; circuit open. " + self.device_breaker.stats())
+
+                if breaker.failure(): #give up on this range until the cool down has passed
+                    self._log.warning("circuit open; " + breaker.stats())
+                elif breaker.state == Breaker_State.CLOSED:
                     #undo step in loop and retry read
-                    retry = retry + 1
-                    total_retries = total_retries + 1
-                    self._log.warning("Retry("+str(retry)+" - ("+str(total_retries)+")) range("+str(index)+")")
+                    self._log.warning("Retry("+str(breaker.failures)+") range("+str(index)+")")
                     index = index - 1
-                    continue
+                continue
+
+            self.device_breaker.success()
+            breaker.success()
+
+            if self.pacing:
+                self.pacing.success(time.perf_counter() - request_time)
+                self.modbus_delay = self.pacing.delay
             elif self.modbus_delay > self.modbus_delay_setting: #no error, decrease delay 
                 self.modbus_delay -= self.modbus_delay_increament
                 if self.modbus_delay < self.modbus_delay_setting:
                     self.modbus_delay = self.modbus_delay_setting
-                
-            
-            retry -= 1
-            if retry < 0:
-                retry = 0
 
- 
             #combine registers into "registry"
             i = -1
             while(i := i + 1 ) < range[1]:
                 #print(str(i) + " => " + str(i+range[0]))
                 registry[i+range[0]] = register.registers[i]
 
+        self._prefetched.clear() #unused prefetched responses are stale now
+
+        if registry_type == Registry_Type.HOLDING:
+            self.holding_cache.update(registry)
+
+        if learned:
+            unreadable = self.unreadable_registers.setdefault(registry_type, set())
+            if not learned.issubset(unreadable):
+                unreadable.update(learned)
+                self._read_ranges.clear() #re-plan
+                self.save_unreadable_registers()
+
         return registry
     
     def read_registry(self, registry_type : Registry_Type = Registry_Type.INPUT) -> dict[str,str]:
@@ -516,6 +971,6 @@ class modbus_base(transport_base):
         if not map:
             return {}
         
-        registry = self.read_modbus_registers(self.protocolSettings.get_registry_ranges(registry_type), registry_type=registry_type)
+        registry = self.read_modbus_registers(self.get_read_ranges(registry_type), registry_type=registry_type)
         info = self.protocolSettings.process_registery(registry, map)
         return info
\ No newline at end of file
@@ -1,3 +1,4 @@
+import copy
 import logging
 from classes.protocol_settings import Registry_Type, protocol_settings
 
@@ -11,6 +12,7 @@ except ImportError:
 
 
 from .modbus_base import modbus_base
+from ..bus_arbiter import bus_arbiter, Bus_Priority
 from configparser import SectionProxy
 from defs.common import find_usb_serial_port, get_usb_serial_port_info, strtoint
 
@@ -43,9 +45,10 @@ class modbus_rtu(modbus_base):
             self.baudrate = strtoint(self.protocolSettings.settings["baud"])
 
         self.baudrate = settings.getint("baudrate", self.baudrate)
+        if self.pacing:
+            self.pacing.baudrate = self.baudrate
 
-        address : int = settings.getint("address", 0)
-        self.addresses = [address]
+        self.addresses = self.parse_addresses(settings.get(["address", "addresses"], fallback="0"))
         
         # pymodbus compatability; unit was renamed to address
         if 'slave' in inspect.signature(ModbusSerialClient.read_holding_registers).parameters:
@@ -56,12 +59,12 @@ class modbus_rtu(modbus_base):
         init_signature = inspect.signature(ModbusSerialClient.__init__)
 
         client_str = self.port+"("+str(self.baudrate)+")"
+        self.bus_id = self.port #one bus per port, whatever the baud
+        self.arbiter = bus_arbiter.get(self.bus_id)
 
         if client_str in modbus_base.clients:
             self.client = modbus_base.clients[client_str]
-            return
-        
-        if 'method' in init_signature.parameters:
+        elif 'method' in init_signature.parameters:
             self.client = ModbusSerialClient(method='rtu', port=self.port, 
                                         baudrate=int(self.baudrate), 
                                         stopbits=1, parity='N', bytesize=8, timeout=2
@@ -72,10 +75,45 @@ class modbus_rtu(modbus_base):
                             baudrate=int(self.baudrate), 
                             stopbits=1, parity='N', bytesize=8, timeout=2
                             )
-            
+
         #add to clients
         modbus_base.clients[client_str] = self.client
+
+        if len(self.addresses) > 1: #several devices on this port; one transport per address, sharing the client
+            self.devices = [self.create_device(address) for address in self.addresses]
         
+    @staticmethod
+    def parse_addresses(text : str) -> list[int]:
+        ''' 1 ; 1,2,5 ; 1-4 '''
+        addresses : list[int] = []
+        for part in text.split(','):
+            part = part.strip()
+            if not part:
+                continue
+
+            if '-' in part:
+                first, last = part.split('-', 1)
+                addresses.extend(range(strtoint(first.strip()), strtoint(last.strip()) + 1))
+            else:
+                addresses.append(strtoint(part))
+
+        return addresses if addresses else [0]
+
+    def create_device(self, address : int) -> 'modbus_rtu':
+        ''' a transport for one address on this port; published under its own device identifier '''
+        device = copy.copy(self)
+        device.addresses = [address]
+        device.devices = None
+        device.transport_name = self.transport_name + "." + str(address)
+        device.bridges = list(self.bridges)
+        device.init_logger()
+        device.device_name = self.device_name + "_" + str(address)
+        if self.device_serial_number: #configured serial; keep devices apart
+            device.device_serial_number = self.device_serial_number + "_" + str(address)
+        device.update_identifier()
+        device.init_device_state()
+        return device
+
     def read_registers(self, start, count=1, registry_type : Registry_Type = Registry_Type.INPUT, **kwargs):
 
         if 'unit' not in kwargs:
@@ -85,10 +123,11 @@ class modbus_rtu(modbus_base):
         if self.pymodbus_slave_arg != 'unit':
             kwargs['slave'] = kwargs.pop('unit')
 
-        if registry_type == Registry_Type.INPUT:
-            return self.client.read_input_registers(address=start, count=count, **kwargs)
-        elif registry_type == Registry_Type.HOLDING:
-            return self.client.read_holding_registers(address=start, count=count, **kwargs)
+        with self.arbiter.request(Bus_Priority.READ):
+            if registry_type == Registry_Type.INPUT:
+                return self.client.read_input_registers(address=start, count=count, **kwargs)
+            elif registry_type == Registry_Type.HOLDING:
+                return self.client.read_holding_registers(address=start, count=count, **kwargs)
         
     def write_register(self, register : int, value : int, **kwargs):
         if not self.write_enabled:
@@ -101,8 +140,15 @@ class modbus_rtu(modbus_base):
         if self.pymodbus_slave_arg != 'unit':
             kwargs['slave'] = kwargs.pop('unit')
 
-        self.client.write_register(register, value, **kwargs) #function code 0x06 writes to holding register
+        with self.arbiter.request(Bus_Priority.WRITE):
+            return self.client.write_register(register, value, **kwargs) #function code 0x06 writes to holding register
 
     def connect(self):
         self.connected = self.client.connect()
-        super().connect()
\ No newline at end of file
+        if not self.devices:
+            super().connect()
+            return
+
+        for device in self.devices:
+            device.connected = self.connected
+            super(modbus_rtu, device).connect()
\ No newline at end of file
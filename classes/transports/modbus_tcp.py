@@ -1,5 +1,9 @@
+import asyncio
+import atexit
 import logging
 import inspect
+import socket
+import struct
 
 from classes.protocol_settings import Registry_Type, protocol_settings
 
@@ -9,16 +13,59 @@ try:
 except ImportError:
     from pymodbus.client import ModbusTcpClient
 
+try:
+    from pymodbus.client import AsyncModbusTcpClient
+except ImportError:
+    AsyncModbusTcpClient = None #older pymodbus; asyncio engine falls back to worker threads
+
 from .modbus_base import modbus_base
 from configparser import SectionProxy
 
 
+class mbap_response:
+    ''' read response decoded by the pipeline; quacks like the pymodbus response '''
+    function_code : int = 0
+    registers : list[int] = []
+    exception_code : int = 0
+
+    def __init__(self, function_code : int, registers : list[int] = None, exception_code : int = 0):
+        self.function_code = function_code
+        self.registers = registers if registers is not None else []
+        self.exception_code = exception_code
+
+    def isError(self) -> bool:
+        return self.function_code > 0x80
+
+    def __str__(self):
+        return "mbap_response(function_code=" + str(self.function_code) + ", exception_code=" + str(self.exception_code) + ")"
+
+
 class modbus_tcp(modbus_base):
     port : str = 502
     host : str = ""
     client : ModbusTcpClient 
     pymodbus_slave_arg = 'unit'
 
+    address : int = 1
+    ''' modbus unit id of the device; tcp gateways in front of a serial bus route requests by it '''
+
+    #this is specifically static
+    async_clients : dict[str, 'AsyncModbusTcpClient'] = {}
+    ''' async counterpart of modbus_base.clients, for the asyncio engine '''
+
+    async_client : 'AsyncModbusTcpClient' = None
+
+    _async_loop : asyncio.AbstractEventLoop = None
+    ''' event loop the async client runs on; blocking calls from other threads are handed to it, so the device only ever sees one connection '''
+
+    pipeline_timeout : float = 7
+    _pipeline_socket : socket.socket = None
+    ''' raw connection for pipelined reads; separate from the pymodbus client '''
+    _transaction_id : int = 0
+
+    MBAP_REQUEST = struct.Struct('>HHHBBHH') #transaction id, protocol id, length, unit, function code, address, count
+    MBAP_HEADER = struct.Struct('>HHHB') #transaction id, protocol id, length, unit
+
     def __init__(self, settings : SectionProxy, protocolSettings : protocol_settings = None):
         #logger = logging.getLogger(__name__)
         #logging.basicConfig(level=logging.DEBUG)
@@ -28,28 +75,124 @@ class modbus_tcp(modbus_base):
             raise ValueError("Host is not set")
         
         self.port = settings.getint("port", self.port)
+        self.address = settings.getint("address", fallback=self.address)
 
         # pymodbus compatability; unit was renamed to address
         if 'slave' in inspect.signature(ModbusTcpClient.read_holding_registers).parameters:
             self.pymodbus_slave_arg = 'slave'
 
         client_str = self.host+"("+str(self.port)+")"
+        self.bus_id = client_str
+
         #check if client is already initialied
         if client_str in modbus_base.clients:
             self.client = modbus_base.clients[client_str]
+        else:
+            self.client = ModbusTcpClient(host=self.host, port=self.port, timeout=7, retries=3)
+
+            #add to clients
+            modbus_base.clients[client_str] = self.client
+
+        super().__init__(settings, protocolSettings=protocolSettings)
+
+        self.pipeline_window = settings.getint('pipeline_window', fallback=self.pipeline_window)
+        if self.pipeline_window > 1:
+            atexit.register(self.close_pipeline)
+
+    def prefetch_registers(self, requests : list[tuple[int, int, Registry_Type]]):
+        ''' pipelined reads; up to pipeline_window requests are in flight, and replies are matched by transaction id.
+        on any error the connection is dropped, and whatever wasn't answered is read the normal way '''
+        self._prefetched.clear()
+        if self.pipeline_window <= 1 or not requests:
             return
 
-        self.client = ModbusTcpClient(host=self.host, port=self.port, timeout=7, retries=3)
+        try:
+            if self._pipeline_socket is None:
+                self._pipeline_socket = socket.create_connection((self.host, self.port), timeout=self.pipeline_timeout)
 
-        #add to clients
-        modbus_base.clients[client_str] = self.client
+            in_flight : dict[int, tuple[int, int, Registry_Type]] = {}
+            pending = list(reversed(requests))
+            while pending or in_flight:
+                while pending and len(in_flight) < self.pipeline_window:
+                    start, count, registry_type = pending.pop()
+                    self._transaction_id = (self._transaction_id + 1) & 0xFFFF
+                    function_code = 0x04 if registry_type == Registry_Type.INPUT else 0x03
+                    self._pipeline_socket.sendall(self.MBAP_REQUEST.pack(self._transaction_id, 0, 6, self.address, function_code, start, count))
+                    in_flight[self._transaction_id] = (start, count, registry_type)
+
+                transaction_id, response = self.receive_mbap()
+                request = in_flight.pop(transaction_id, None)
+                if request is None: #stale reply, from an earlier failed pipeline
+                    continue
+
+                if not response.isError() and len(response.registers) != request[1]:
+                    raise ValueError("pipelined read returned " + str(len(response.registers)) + " registers, expected " + str(request[1]))
+
+                self._prefetched[request] = response
+
+        except (OSError, ValueError, struct.error) as e:
+            self._log.warning("pipelined read failed; " + str(e))
+            self.close_pipeline()
+
+    def receive_mbap(self) -> tuple[int, mbap_response]:
+        transaction_id, protocol_id, length, unit = self.MBAP_HEADER.unpack(self.receive_exactly(self.MBAP_HEADER.size))
+        pdu = self.receive_exactly(length - 1)
+        if protocol_id != 0 or not pdu:
+            raise ValueError("invalid mbap frame")
+
+        function_code = pdu[0]
+        if function_code > 0x80:
+            return transaction_id, mbap_response(function_code, exception_code=pdu[1])
+
+        byte_count = pdu[1]
+        return transaction_id, mbap_response(function_code, list(struct.unpack('>' + str(byte_count // 2) + 'H', pdu[2:2 + byte_count])))
+
+    def receive_exactly(self, size : int) -> bytes:
+        data = b''
+        while len(data) < size:
+            chunk = self._pipeline_socket.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError("connection closed")
+            data += chunk
+        return data
+
+    def close_pipeline(self):
+        ''' closes the pipelined read connection; reopened by the next prefetch '''
+        if self._pipeline_socket is not None:
+            try:
+                self._pipeline_socket.close()
+            except OSError:
+                pass
+            self._pipeline_socket = None
+
+    def run_on_async_client(self, coroutine):
+        ''' runs a request on the async client's event loop and waits for it; for blocking callers, such as writes from mqtt '''
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+
+        if running_loop is self._async_loop:
+            coroutine.close()
+            raise RuntimeError("blocking modbus request on the event loop; use the async version")
+
+        return asyncio.run_coroutine_threadsafe(coroutine, self._async_loop).result()
+
+    def async_client_active(self) -> bool:
+        ''' true while the asyncio engine owns the connection '''
+        return self.async_client is not None and self.async_client.connected and self._async_loop is not None and self._async_loop.is_running()
 
-        super().__init__(settings, protocolSettings=protocolSettings)
-        
     def read_registers(self, start, count=1, registry_type : Registry_Type = Registry_Type.INPUT, **kwargs):
+        if self._prefetched and not kwargs:
+            response = self._prefetched.pop((start, count, registry_type), None)
+            if response is not None:
+                return response
+
+        if self.async_client_active():
+            return self.run_on_async_client(self.read_registers_async(start, count, registry_type, **kwargs))
 
         if 'unit' not in kwargs:
-            kwargs = {'unit': 1, **kwargs}
+            kwargs = {'unit': self.address, **kwargs}
 
         #compatability
         if self.pymodbus_slave_arg != 'unit':
@@ -60,6 +203,71 @@ class modbus_tcp(modbus_base):
         elif registry_type == Registry_Type.HOLDING:
             return self.client.read_holding_registers(start, count, **kwargs)
     
+    def write_register(self, register : int, value : int, **kwargs):
+        if not self.write_enabled:
+            return
+
+        kwargs.pop('registry_type', None) #only holding registers are writable
+
+        if self.async_client_active():
+            return self.run_on_async_client(self.write_register_async(register, value, **kwargs))
+
+        if 'unit' not in kwargs:
+            kwargs = {'unit': self.address, **kwargs}
+
+        #compatability
+        if self.pymodbus_slave_arg != 'unit':
+            kwargs['slave'] = kwargs.pop('unit')
+
+        return self.client.write_register(register, value, **kwargs) #function code 0x06 writes to holding register
+
+    async def write_register_async(self, register : int, value : int, **kwargs):
+        if 'unit' not in kwargs:
+            kwargs = {'unit': self.address, **kwargs}
+
+        #compatability
+        if self.pymodbus_slave_arg != 'unit':
+            kwargs['slave'] = kwargs.pop('unit')
+
+        return await self.async_client.write_register(register, value, **kwargs)
+
     def connect(self):
+        self.close_pipeline() #reconnecting; don't leave a stale session open, many devices only allow one or two
         self.connected = self.client.connect()
-        super().connect()
\ No newline at end of file
+        super().connect()
+
+    async def read_registers_async(self, start, count=1, registry_type : Registry_Type = Registry_Type.INPUT, **kwargs):
+        if self._prefetched and not kwargs:
+            response = self._prefetched.pop((start, count, registry_type), None)
+            if response is not None:
+                return response
+
+        if AsyncModbusTcpClient is None:
+            return await super().read_registers_async(start, count, registry_type, **kwargs)
+
+        if self.async_client is None:
+            #async client has to be created inside of the event loop
+            client_str = self.host+"("+str(self.port)+")"
+            if client_str not in modbus_tcp.async_clients:
+                modbus_tcp.async_clients[client_str] = AsyncModbusTcpClient(host=self.host, port=self.port, timeout=7, retries=3)
+            self.async_client = modbus_tcp.async_clients[client_str]
+            self._async_loop = asyncio.get_running_loop()
+
+        if not self.async_client.connected:
+            self.client.close() #hand the connection over; blocking requests ( writes ) are routed to the async client from now on, see run_on_async_client
+            self.close_pipeline()
+            if not await self.async_client.connect():
+                self.connected = False
+                raise ConnectionError("Failed to connect async client " + self.host + ":" + str(self.port))
+
+        if 'unit' not in kwargs:
+            kwargs = {'unit': self.address, **kwargs}
+
+        #compatability
+        if self.pymodbus_slave_arg != 'unit':
+            kwargs['slave'] = kwargs.pop('unit')
+
+        if registry_type == Registry_Type.INPUT:
+            return await self.async_client.read_input_registers(start, count, **kwargs)
+        elif registry_type == Registry_Type.HOLDING:
+            return await self.async_client.read_holding_registers(start, count, **kwargs)
\ No newline at end of file
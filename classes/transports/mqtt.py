@@ -93,6 +93,8 @@ class mqtt(transport_base):
         self.mqtt_properties = paho.mqtt.properties.Properties(paho.mqtt.packettypes.PacketTypes.PUBLISH)
         self.mqtt_properties.MessageExpiryInterval = 30  # in seconds
 
+        self.__write_topics = {}
+
         self.write_enabled = True #set default
         super().__init__(settings)
         
@@ -151,7 +153,8 @@ class mqtt(transport_base):
         self._log.info("Connected with result code %s\n",str(rc))
         self.connected = True
 
-    __write_topics : dict[str, registry_map_entry] = {}
+    __write_topics : dict[str, tuple[registry_map_entry, str]] = {}
+    ''' topic -> (entry, name of the transport the entry belongs to) '''
 
     def write_data(self, data : dict[str, str], from_transport : transport_base):
         if not self.write_enabled:
@@ -178,26 +181,31 @@ class mqtt(transport_base):
 
                 self.client.publish(str(self.base_topic+'/'+from_transport.device_identifier+'/'+entry).lower(), str(val))
 
+    async def write_data_async(self, data : dict[str, str], from_transport : transport_base):
+        ''' paho publishes from its own network thread ( loop_start ), so publishing never blocks the event loop; no worker thread needed '''
+        self.write_data(data, from_transport)
+
     def client_on_message(self, client, userdata, msg):
         """ The callback for when a PUBLISH message is received from the server. """
         self._log.info(msg.topic+" "+str(msg.payload.decode('utf-8')))
 
         #self.protocolSettings.validate_registry_entry
         if msg.topic in self.__write_topics:
-            entry = self.__write_topics[msg.topic]
-            self.on_message(self, entry, msg.payload.decode('utf-8'))
+            entry, transport_name = self.__write_topics[msg.topic]
+            self.on_message(self, entry, msg.payload.decode('utf-8'), transport_name)
             #self.write_variable(entry, value=str(msg.payload.decode('utf-8')))
 
     def init_bridge(self, from_transport : transport_base):
-        
+        if not from_transport.protocolSettings: #nothing to subscribe / discover. ie: bridged to another mqtt transport
+            return
+
         if from_transport.write_enabled:
-            self.__write_topics = {}
             #subscribe to write topics
             for entry in from_transport.protocolSettings.get_registry_map(Registry_Type.HOLDING):
                 if entry.write_mode == WriteMode.WRITE or entry.write_mode == WriteMode.WRITEONLY:
                     #__write_topics
                     topic : str = self.base_topic + '/'+ from_transport.device_identifier + "/write/" + entry.variable_name.lower().replace(' ', '_')
-                    self.__write_topics[topic] = entry
+                    self.__write_topics[topic] = (entry, from_transport.transport_name)
                     self.client.subscribe(topic)
 
         if self.discovery_enabled:
@@ -8,6 +8,7 @@ from ..Object import Object
 from .serial_frame_client import serial_frame_client
 from .transport_base import transport_base
 from defs.common import find_usb_serial_port, get_usb_serial_port_info
+from classes.protocol_settings import Registry_Type
 
 
 
@@ -134,10 +135,7 @@ class serial_pylon(transport_base):
         registry_map = self.protocolSettings.get_registry_map()
 
         if entry == None:
-            for e in registry_map:
-                if e.variable_name == variable_name:
-                    entry = e
-                    break
+            entry = self.protocolSettings.get_variable_entry(variable_name, Registry_Type.ZERO)
         
 
         if entry:
@@ -1,4 +1,5 @@
 
+import asyncio
 import logging
 from classes.protocol_settings import Registry_Type,protocol_settings,registry_map_entry
 
@@ -19,6 +20,10 @@ class transport_base:
     device_model : str = 'hotnoob'
     device_identifier : str = 'hotnoob'
     bridge : str = ''
+    bridges : list[str] = []
+    ''' bridge as a list; bridge can be a csv of transport names, or "broadcast" '''
+    bus_id : str = ''
+    ''' identifies the physical bus / connection; transports sharing a bus are read by the same worker '''
     write_enabled : bool = False
     max_precision : int = 2
 
@@ -28,7 +33,7 @@ class transport_base:
     connected : bool = False
 
     on_message : Callable[['transport_base', registry_map_entry, str], None] = None
-    ''' callback, on message recieved '''
+    ''' callback, on message recieved; optional 4th argument limits the message to the named bridged transport '''
 
     _log : logging.Logger = None
 
@@ -38,18 +43,23 @@ class transport_base:
 
         #apply log level to logger
         self._log_level = getattr(logging, settings.get('log_level', fallback='INFO'), logging.INFO)
-        short_name : str = __name__[__name__.rfind('.'): ] if '.' in __name__ else None
-        self._log : logging.Logger = logging.getLogger(short_name + f"[{self.transport_name}]")
-
-        self._log.setLevel(self._log_level)
+        self.init_logger()
         
         self.type = self.__class__.__name__ 
 
+        if not self.bus_id:
+            self.bus_id = self.transport_name
+
         self.protocolSettings = protocolSettings
         if not self.protocolSettings: #if not, attempt to load. lazy i know
             self.protocol_version = settings.get('protocol_version')
             if self.protocol_version:
-                self.protocolSettings = protocol_settings(self.protocol_version)
+                #per transport variable mask / screen; default to the global files
+                variable_mask = settings.get('variable_mask', fallback=None)
+                variable_screen = settings.get('variable_screen', fallback=None)
+                self.protocolSettings = protocol_settings(self.protocol_version,
+                                                          variable_mask=protocol_settings.parse_variable_list(variable_mask) if variable_mask is not None else None,
+                                                          variable_screen=protocol_settings.parse_variable_list(variable_screen) if variable_screen is not None else None)
 
         if self.protocolSettings:
             self.protocol_version = self.protocolSettings.protocol
@@ -61,6 +71,7 @@ class transport_base:
             self.device_manufacturer = settings.get(["device_manufacturer", "manufacturer"], self.device_manufacturer)
             self.device_name = settings.get(['device_name', 'name'], fallback=self.device_manufacturer+"_"+self.device_serial_number)
             self.bridge = settings.get("bridge", self.bridge)
+            self.bridges = [bridge.strip() for bridge in self.bridge.split(',') if bridge.strip()]
             self.read_interval = settings.getfloat("read_interval", self.read_interval)
             self.max_precision = settings.getint(["max_precision", "precision"], self.max_precision)
             if "write_enabled" in settings:
@@ -71,6 +82,12 @@ class transport_base:
         self.update_identifier()
 
 
+    def init_logger(self):
+        ''' logger named after transport_name; again when the name changes, ie: modbus_rtu devices '''
+        short_name : str = __name__[__name__.rfind('.'): ] if '.' in __name__ else None
+        self._log : logging.Logger = logging.getLogger(short_name + f"[{self.transport_name}]")
+        self._log.setLevel(self._log_level)
+
     def update_identifier(self):
         self.device_identifier = self.device_serial_number.strip().lower()
 
@@ -97,6 +114,33 @@ class transport_base:
         return type may be changed to dict[str, registrsy_map_entry]. still thinking about this'''
         pass
 
+    def get_devices(self) -> list['transport_base']:
+        ''' the devices behind this transport, each published under its own device_identifier; 
+        transports that poll several devices on one connection return a transport per device, see modbus_rtu addresses '''
+        return [self]
+
+    def read_devices(self) -> list[tuple['transport_base', dict[str,str]]]:
+        ''' read_data per device; (device, info) '''
+        return [(self, self.read_data())]
+
+    #region - asyncio
+    #defaults run the blocking functions in a worker thread; transports with native async io override these
+    async def connect_async(self):
+        await asyncio.to_thread(self.connect)
+
+    async def write_data_async(self, data : dict[str, str], from_transport : 'transport_base'):
+        await asyncio.to_thread(self.write_data, data, from_transport)
+
+    async def read_data_async(self) -> dict[str,str]:
+        return await asyncio.to_thread(self.read_data)
+
+    async def read_devices_async(self) -> list[tuple['transport_base', dict[str,str]]]:
+        return [(self, await self.read_data_async())]
+
+    async def read_registers_async(self, start, count=1, registry_type : Registry_Type = Registry_Type.INPUT, **kwargs):
+        return await asyncio.to_thread(self.read_registers, start, count, registry_type, **kwargs)
+    #endregion
+
 
 
     def enable_write(self):
@@ -20,15 +20,22 @@ if sys.version_info < (3, 9):
 
 import argparse
 
+import asyncio
 import atexit
 import os
 import logging
+import queue
 import sys
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 from configparser import ConfigParser, NoOptionError
 
 from classes.protocol_settings import protocol_settings,Data_Type,registry_map_entry,Registry_Type,WriteMode
 from classes.transports.transport_base import transport_base
+from classes.transport_scheduler import transport_scheduler
+from classes.transport_worker import transport_worker
+from classes.bridge_queue import bridge_queue, Queue_Policy
+from classes.delta_filter import delta_filter
 
 
 __logo = """
@@ -88,12 +95,39 @@ class Protocol_Gateway:
     __running : bool = False
     ''' controls main loop'''
 
-    __transports : list[transport_base] = []
+    __transports : list[transport_base]
     ''' transport_base is for type hinting. this can be any transport'''
 
+    __execution_mode : str = 'sequential'
+    ''' sequential; reads every transport from the main loop. threaded; one worker thread per bus. asyncio; one task per bus '''
+
+    __workers : list[transport_worker]
+
+    __bridge_routes : dict[str, list[transport_base]]
+    ''' transport name -> transports that its read data is sent to '''
+
+    __message_routes : dict[str, list[transport_base]]
+    ''' transport name -> transports that its messages are sent to; bridges are two way for messages '''
+
+    __bridge_queues : dict[str, bridge_queue]
+    ''' transport name -> queue in front of that transport '''
+
+    __filters : dict[str, delta_filter]
+    ''' transport name -> delta filter applied to data read from that transport '''
+
+    connect_wait : float = 0.7
+    ''' seconds; upper bound to wait at startup for transports that connect in the background '''
+
     config_file : str
 
     def __init__(self, config_file : str):
+        self.__transports = []
+        self.__workers = []
+        self.__bridge_routes = {}
+        self.__message_routes = {}
+        self.__bridge_queues = {}
+        self.__filters = {}
+
         self.__log = logging.getLogger('invertermodbustomqqt_log')
         handler = logging.StreamHandler(sys.stdout)
         #self.__log.setLevel(logging.DEBUG)
@@ -123,6 +157,10 @@ class Protocol_Gateway:
         self.__log.setLevel(log_level)
         logging.basicConfig(level=log_level)
 
+        self.__execution_mode = self.__settings.get('general', 'execution_mode', fallback=self.__execution_mode).lower()
+        if self.__execution_mode not in ('sequential', 'threaded', 'asyncio'):
+            raise ValueError('Invalid execution_mode: ' + self.__execution_mode)
+
         for section in self.__settings.sections():
             if section.startswith('transport'):
                 transport_cfg = self.__settings[section]
@@ -153,26 +191,132 @@ class Protocol_Gateway:
                 self.__transports.append(transport)
 
         #connect first
+        self.connect_transports()
+
+        #apply links
+        self.build_routes()
+        self.build_queues()
+        self.build_filters()
+        for from_transport in self.__transports:
+            for to_transport in self.__bridge_routes[from_transport.transport_name]:
+                from_transport.init_bridge(to_transport)
+                for device in from_transport.get_devices():
+                    to_transport.init_bridge(device)
+
+    def group_by_bus(self) -> dict[str, list[transport_base]]:
+        ''' bus_id -> transports on that physical bus '''
+        buses : dict[str, list[transport_base]] = {}
         for transport in self.__transports:
+            buses.setdefault(transport.bus_id, []).append(transport)
+        return buses
+
+    def connect_transports(self):
+        ''' connects every bus in parallel; transports on the same bus connect one after another, including their init_after_connect '''
+        start = time.perf_counter()
+        buses = self.group_by_bus()
+
+        if buses:
+            with ThreadPoolExecutor(max_workers=len(buses), thread_name_prefix="connect") as executor:
+                for future in [executor.submit(self.connect_bus, transports) for transports in buses.values()]:
+                    future.result()
+
+        #some transports, such as mqtt, report connected from a callback; give them a moment
+        deadline = time.monotonic() + self.connect_wait
+        while time.monotonic() < deadline and not all(transport.connected for transport in self.__transports):
+            time.sleep(0.05)
+
+        self.__log.info("Connected " + str(len(self.__transports)) + " transport(s) on " + str(len(buses)) + " bus(es) in " + format(time.perf_counter() - start, ".2f") + "s")
+
+    def connect_bus(self, transports : list[transport_base]):
+        for transport in transports:
             self.__log.info("Connecting to "+str(transport.type)+":" +str(transport.transport_name)+"...")
-            transport.connect()
+            start = time.perf_counter()
+            try:
+                transport.connect()
+            except Exception as err:
+                traceback.print_exc()
+                self.__log.error("Failed to connect " + transport.transport_name + " : " + str(err))
+
+            self.__log.info(transport.transport_name + (" connected" if transport.connected else " not connected") + " in " + format(time.perf_counter() - start, ".2f") + "s")
+
+    def build_routes(self):
+        ''' builds the routing tables once, so bridging is a dict lookup instead of a scan over every transport '''
+        transports : dict[str, transport_base] = {transport.transport_name : transport for transport in self.__transports}
+
+        self.__bridge_routes = {name : [] for name in transports}
+        self.__message_routes = {name : [] for name in transports}
+
+        for from_transport in self.__transports:
+            for bridge in from_transport.bridges:
+                if bridge == 'broadcast':
+                    to_transports = [to_transport for to_transport in self.__transports if to_transport is not from_transport]
+                elif bridge in transports and transports[bridge] is not from_transport:
+                    to_transports = [transports[bridge]]
+                else:
+                    self.__log.warning("Unknown bridge '" + bridge + "' on " + from_transport.transport_name)
+                    continue
+
+                for to_transport in to_transports:
+                    if to_transport in self.__bridge_routes[from_transport.transport_name]:
+                        continue
+
+                    #data read flows from -> to
+                    self.__bridge_routes[from_transport.transport_name].append(to_transport)
+
+                    #messages ( ie: writes from mqtt ) flow both ways
+                    if to_transport not in self.__message_routes[from_transport.transport_name]:
+                        self.__message_routes[from_transport.transport_name].append(to_transport)
+                    if from_transport not in self.__message_routes[to_transport.transport_name]:
+                        self.__message_routes[to_transport.transport_name].append(from_transport)
+
+        for name, to_transports in self.__bridge_routes.items():
+            if to_transports:
+                self.__log.info("bridge " + name + " -> " + ", ".join(to_transport.transport_name for to_transport in to_transports))
+
+    def build_queues(self):
+        ''' bounded queues in front of transports configured with queue_policy / queue_size '''
+        for transport in self.__transports:
+            transport_cfg = self.__settings[transport.transport_name]
+            if 'queue_policy' not in transport_cfg and 'queue_size' not in transport_cfg:
+                continue
 
-        time.sleep(0.7)
-        #apply links
-        for to_transport in self.__transports:
-            for from_transport in self.__transports:
-                if to_transport.bridge == from_transport.transport_name:
-                    to_transport.init_bridge(from_transport)
-                    from_transport.init_bridge(to_transport)
-
-
-    def on_message(self, transport : transport_base, entry : registry_map_entry, data : str):
-        ''' message recieved from a transport! '''
-        for to_transport in self.__transports:
-            if to_transport.transport_name != transport.transport_name:
-                if to_transport.transport_name == transport.bridge or transport.transport_name == to_transport.bridge:
-                    to_transport.write_data({entry.variable_name : data}, transport)
-                    break
+            policy = Queue_Policy.fromString(transport_cfg.get('queue_policy', fallback='drop_oldest'))
+            max_size = transport_cfg.getint('queue_size', fallback=bridge_queue.max_size)
+            self.__bridge_queues[transport.transport_name] = bridge_queue(transport, policy, max_size, on_drop=self.invalidate_filter)
+            self.__log.info("queue " + transport.transport_name + " : " + policy.name.lower() + " (" + str(max_size) + ")")
+
+    def build_filters(self):
+        ''' change only forwarding, for transports configured with changes_only or with deadbands in their registry map '''
+        for transport in self.__transports:
+            transport_cfg = self.__settings[transport.transport_name]
+            changes_only = transport_cfg.getboolean('changes_only', fallback=False)
+
+            #deadbands from the registry map
+            deadbands : dict[str, tuple[float, bool]] = {}
+            if transport.protocolSettings:
+                for registry_map in transport.protocolSettings.registry_map.values():
+                    for entry in registry_map:
+                        if entry.deadband > 0:
+                            deadbands[entry.variable_name] = (entry.deadband, entry.deadband_percent)
+
+            if not changes_only and not deadbands:
+                continue
+
+            full_refresh_interval = transport_cfg.getfloat('full_refresh_interval', fallback=delta_filter.full_refresh_interval)
+            for device in transport.get_devices():
+                self.__filters[device.transport_name] = delta_filter(changes_only, full_refresh_interval, deadbands)
+
+    def on_message(self, transport : transport_base, entry : registry_map_entry, data : str, to_transport_name : str = None):
+        ''' message recieved from a transport! 
+        to_transport_name; optional, limits the message to one bridged transport. ie: the device a mqtt write topic belongs to'''
+        for to_transport in self.__message_routes[transport.transport_name]:
+            if not to_transport_name:
+                to_transport.write_data({entry.variable_name : data}, transport)
+                continue
+
+            for device in to_transport.get_devices():
+                if device.transport_name == to_transport_name:
+                    device.write_data({entry.variable_name : data}, transport)
 
     def run(self):
         """
@@ -184,36 +328,169 @@ class Protocol_Gateway:
         if False:
             self.enable_write()
 
+        for to_queue in self.__bridge_queues.values():
+            to_queue.start()
+
+        if self.__execution_mode == 'threaded':
+            self.run_threaded()
+            return
+
+        if self.__execution_mode == 'asyncio':
+            asyncio.run(self.run_async())
+            return
+
+        scheduler = transport_scheduler(self.__transports)
+
+        while self.__running:
+            for transport, due in scheduler.pop_due():
+                for device, info in self.read_transport(transport, due):
+                    if info:
+                        self.bridge_data(transport, info, device)
+
+            scheduler.sleep()
+
+    def run_threaded(self):
+        ''' each bus is read by its own worker; this thread only bridges the results '''
+        results : queue.Queue = queue.Queue()
+
+        #transports on the same physical bus share a worker, so they never talk over each other
+        for bus_id, transports in self.group_by_bus().items():
+            worker = transport_worker(bus_id, transports, self.read_transport, results)
+            self.__workers.append(worker)
+            worker.start()
+
         while self.__running:
+            transport, device, info = results.get()
+            self.bridge_data(transport, info, device)
+
+    async def run_async(self):
+        ''' asyncio engine; every bus gets a task, transports with native async io keep many devices in flight on one thread '''
+        await asyncio.gather(*(self.read_bus_async(transports) for transports in self.group_by_bus().values()))
+
+        while self.__running: #passive transports only; keep running
+            await asyncio.sleep(transport_scheduler.idle_sleep)
+
+    async def read_bus_async(self, transports : list[transport_base]):
+        scheduler = transport_scheduler(transports)
+
+        while self.__running:
+            for transport, due in scheduler.pop_due():
+                for device, info in await self.read_transport_async(transport, due):
+                    if info:
+                        await self.bridge_data_async(transport, info, device)
+
+            due = scheduler.next_due()
+            if due is None: #nothing to read on this bus
+                return
+
+            await asyncio.sleep(max(0, due - time.monotonic()))
+
+    def log_lateness(self, transport : transport_base, due : float = None):
+        ''' due; monotonic time the read was scheduled for, see transport_scheduler.pop_due. measured as the read starts '''
+        if due is None:
+            return
+
+        lateness : float = time.monotonic() - due
+        if lateness > transport.read_interval:
+            self.__log.warning(f"{transport.transport_name} read is {lateness:.3f}s late; skipped missed reads")
+        else:
+            self.__log.debug(f"{transport.transport_name} read is {lateness:.3f}s late")
+
+    def read_transport(self, transport : transport_base, due : float = None) -> list[tuple[transport_base, dict[str, str]]]:
+        ''' reads a transport; returns (device, info) to bridge, for each device on the transport '''
+        self.log_lateness(transport, due)
+
+        transport.last_read_time = time.time()
+
+        try:
+            #preform read
+            if not transport.connected:
+                transport.connect() #reconnect
+                return []
+
+            #transport is connected
+            return transport.read_devices()
+
+        except Exception as err:
+            traceback.print_exc()
+            self.__log.error(err)
+
+        return []
+
+    async def read_transport_async(self, transport : transport_base, due : float = None) -> list[tuple[transport_base, dict[str, str]]]:
+        ''' asyncio version of read_transport '''
+        self.log_lateness(transport, due)
+
+        transport.last_read_time = time.time()
+
+        try:
+            if not transport.connected:
+                await transport.connect_async() #reconnect
+                return []
+
+            return await transport.read_devices_async()
+
+        except Exception as err:
+            traceback.print_exc()
+            self.__log.error(err)
+
+        return []
+
+    def filter_data(self, transport : transport_base, info : dict[str, str]) -> dict[str, str]:
+        ''' applies the transport's ( or device's ) delta filter, if any '''
+        if transport.transport_name not in self.__filters:
+            return info
+
+        return self.__filters[transport.transport_name].filter(info)
+
+    def invalidate_filter(self, transport : transport_base, info : dict[str, str]):
+        ''' info from transport ( or device ) was not delivered; its delta filter forwards those variables again on the next read '''
+        if transport.transport_name in self.__filters:
+            self.__filters[transport.transport_name].invalidate(info)
+
+    def bridge_data(self, transport : transport_base, info : dict[str, str], device : transport_base = None):
+        ''' sends info read from transport to its bridged transports; device is the device on the transport the info was read from, see transport_base.get_devices '''
+        if device is None:
+            device = transport
+
+        info = self.filter_data(device, info)
+        if not info:
+            return
+
+        for to_transport in self.__bridge_routes[transport.transport_name]:
             try:
-                now = time.time()
-                for transport in self.__transports:
-                    if transport.read_interval > 0 and now - transport.last_read_time  > transport.read_interval:
-                        transport.last_read_time = now
-                        #preform read
-                        if not transport.connected:
-                            transport.connect() #reconnect
-                        else: #transport is connected
-                            
-                            info = transport.read_data()
-
-                            if not info:
-                                continue
-                            
-                            #todo. broadcast option
-                            if transport.bridge:
-                                for to_transport in self.__transports:
-                                    if to_transport.transport_name == transport.bridge:
-                                        to_transport.write_data(info, transport)
-                                        break
-              
+                if to_transport.transport_name in self.__bridge_queues:
+                    self.__bridge_queues[to_transport.transport_name].put(device, info)
+                else:
+                    to_transport.write_data(info, device)
             except Exception as err:
                 traceback.print_exc()
                 self.__log.error(err)
+                self.invalidate_filter(device, info)
+
+    async def bridge_data_async(self, transport : transport_base, info : dict[str, str], device : transport_base = None):
+        ''' asyncio version of bridge_data '''
+        if device is None:
+            device = transport
 
-            time.sleep(7)
+        info = self.filter_data(device, info)
+        if not info:
+            return
 
-   
+        for to_transport in self.__bridge_routes[transport.transport_name]:
+            try:
+                if to_transport.transport_name in self.__bridge_queues:
+                    to_queue = self.__bridge_queues[to_transport.transport_name]
+                    if to_queue.policy == Queue_Policy.BLOCK: #wait without blocking the event loop
+                        await asyncio.to_thread(to_queue.put, device, info)
+                    else:
+                        to_queue.put(device, info)
+                else:
+                    await to_transport.write_data_async(info, device)
+            except Exception as err:
+                traceback.print_exc()
+                self.__log.error(err)
+                self.invalidate_filter(device, info)
 
 
 
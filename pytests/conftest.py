@@ -0,0 +1,175 @@
+import sys
+import os
+import pytest
+
+
+#move up a folder for tests
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from protocol_gateway import CustomConfigParser, Protocol_Gateway
+from classes.Object import Object
+from classes.protocol_settings import protocol_settings, Registry_Type
+from classes.transports.modbus_base import modbus_base
+from classes.transports.modbus_tcp import modbus_tcp
+from classes.transports.modbus_rtu import modbus_rtu
+
+
+class registers_response:
+    ''' successful read / write response '''
+    def __init__(self, registers : list[int]):
+        self.registers = registers
+
+    def isError(self):
+        return False
+
+
+class error_response:
+    def isError(self):
+        return True
+
+
+class fake_modbus:
+    ''' in memory device; reads are answered by respond, writes are stored in registers '''
+
+    registers_response = registers_response
+    error_response = error_response
+
+    registers : dict[int, int]
+    ''' register -> value; missing registers read as 0 '''
+
+    requests : list[tuple[int, int, int]]
+    ''' (address, start, count) of every read, in the order they were sent '''
+
+    fail_writes : bool = False
+
+    def respond(self, start : int, count : int, registry_type : Registry_Type):
+        return registers_response([self.registers.get(register, 0) for register in range(start, start + count)])
+
+    def read_registers(self, start, count=1, registry_type : Registry_Type = Registry_Type.INPUT, **kwargs):
+        if self._prefetched: #pipelined; see modbus_tcp.prefetch_registers
+            response = self._prefetched.pop((start, count, registry_type), None)
+            if response is not None:
+                return response
+
+        self.requests.append((getattr(self, 'addresses', [1])[0], start, count))
+        return self.respond(start, count, registry_type)
+
+    async def read_registers_async(self, start, count=1, registry_type : Registry_Type = Registry_Type.INPUT, **kwargs):
+        return self.read_registers(start, count, registry_type, **kwargs)
+
+    def write_register(self, register : int, value : int, **kwargs):
+        if self.fail_writes:
+            return error_response()
+        self.registers[register] = value
+        return registers_response([value])
+
+
+class fake_modbus_tcp(fake_modbus, modbus_tcp):
+    pass
+
+
+class fake_modbus_rtu(fake_modbus, modbus_rtu):
+    pass
+
+
+@pytest.fixture(autouse=True)
+def isolated_state(tmp_path, monkeypatch):
+    ''' protocol caches and learned device state go to tmp_path instead of the working directory '''
+    monkeypatch.setattr(protocol_settings, 'cache_dir', '')
+    monkeypatch.setattr(modbus_base, 'state_dir', str(tmp_path / 'state'))
+
+
+@pytest.fixture
+def create_protocol(tmp_path):
+    ''' factory; writes a protocol to tmp_path and loads it. maps is registry map file suffix -> csv, ie: {"input_registry_map" : "..."} '''
+    def create(name : str, json : str = '{"transport" : "modbus_tcp"}', maps : dict[str, str] = None, **kwargs) -> protocol_settings:
+        settings_dir = str(tmp_path / 'protocols')
+        os.makedirs(settings_dir, exist_ok=True)
+        with open(os.path.join(settings_dir, name + '.json'), 'w') as f:
+            f.write(json)
+
+        for suffix, csv in (maps or {}).items():
+            with open(os.path.join(settings_dir, name + '.' + suffix + '.csv'), 'w') as f:
+                f.write(csv)
+
+        kwargs.setdefault('cache_dir', '')
+        return protocol_settings(name, settings_dir=settings_dir, **kwargs)
+
+    return create
+
+
+@pytest.fixture
+def create_transport(tmp_path):
+    ''' factory; a fake modbus device that never connects, or the real transport when fake is false. settings are transport section options '''
+    def create(protocolSettings : protocol_settings = None, rtu : bool = False, fake : bool = True, **settings) -> fake_modbus:
+        options : dict[str, str] = {'port' : '/dev/ttyTEST0'} if rtu else {'host' : '127.0.0.1', 'port' : '1'}
+        options.update({'batch_delay' : '0', 'state_dir' : str(tmp_path / 'state')})
+        options.update({key : str(value) for key, value in settings.items()})
+
+        parser = CustomConfigParser()
+        parser.read_dict({'transport.test' : options})
+
+        if protocolSettings is None:
+            protocolSettings = protocol_settings('eg4_v58', cache_dir='')
+
+        if fake:
+            cls = fake_modbus_rtu if rtu else fake_modbus_tcp
+        else: #real transport; requests go to its client
+            cls = modbus_rtu if rtu else modbus_tcp
+
+        transport = cls(parser['transport.test'], protocolSettings)
+        #devices on the same bus share the register values and the request log
+        registers : dict[int, int] = {}
+        requests : list[tuple[int, int, int]] = []
+        for device in {transport, *transport.get_devices()}:
+            device.registers = registers
+            device.requests = requests
+        return transport
+
+    return create
+
+
+@pytest.fixture
+def create_device(create_protocol, create_transport):
+    ''' factory; a fake modbus device running a protocol written from maps, see create_protocol. registers are its initial register values '''
+    def create(name : str, json : str = '{"transport" : "modbus_tcp"}', maps : dict[str, str] = None, registers : dict[int, int] = None, **settings) -> fake_modbus:
+        transport = create_transport(create_protocol(name, json, maps), **settings)
+        transport.registers.update(registers or {})
+        return transport
+
+    return create
+
+
+@pytest.fixture
+def create_stub_transport():
+    ''' factory; a bare transport stand in with only a name and read_interval, for scheduler / worker / queue tests '''
+    def create(name : str, read_interval : float = 0) -> Object:
+        transport = Object()
+        transport.transport_name = name
+        transport.read_interval = read_interval
+        return transport
+
+    return create
+
+
+@pytest.fixture
+def create_gateway(tmp_path, monkeypatch):
+    ''' factory; a gateway loaded from config text. transports are created, connected and routed as on startup '''
+    monkeypatch.setattr(Protocol_Gateway, 'connect_wait', 0)
+
+    def create(config : str, name : str = 'gateway.cfg') -> Protocol_Gateway:
+        path = str(tmp_path / name)
+        with open(path, 'w') as f:
+            f.write(config)
+
+        #config path is relative to protocol_gateway.py
+        gateway_dir = os.path.dirname(os.path.realpath(sys.modules[Protocol_Gateway.__module__].__file__))
+        return Protocol_Gateway(os.path.relpath(path, gateway_dir))
+
+    return create
+
+
+def modbus_section(name : str, port : int, **settings) -> str:
+    ''' config section for a modbus_tcp transport that never connects; each port is its own bus '''
+    options = {'transport' : 'modbus_tcp', 'protocol_version' : 'eg4_v58', 'host' : '127.0.0.1', 'port' : port, **settings}
+    return '[' + name + ']\n' + ''.join(key + ' = ' + str(value) + '\n' for key, value in options.items()) + '\n'
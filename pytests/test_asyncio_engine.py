@@ -0,0 +1,100 @@
+import sys
+import os
+import asyncio
+import threading
+import pytest
+
+
+#move up a folder for tests
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from conftest import modbus_section, registers_response
+from classes.protocol_settings import Registry_Type
+
+
+def test_read_steps_async(create_transport):
+    transport = create_transport()
+    transport.registers.update({0 : 10, 1 : 11, 20 : 20})
+
+    registry = asyncio.run(transport.read_modbus_registers_async([(0, 2), (20, 1)]))
+    assert registry == {0 : 10, 1 : 11, 20 : 20}
+    assert [(start, count) for address, start, count in transport.requests] == [(0, 2), (20, 1)]
+
+
+def test_bus_loop(create_gateway):
+    gateway = create_gateway(modbus_section('transport.a', 1, bridge='transport.c', read_interval=0.01)
+                             + modbus_section('transport.b', 1, bridge='transport.c', read_interval=0.01)
+                             + modbus_section('transport.c', 2))
+    transports = {transport.transport_name : transport for transport in gateway._Protocol_Gateway__transports}
+
+    reads : list[str] = []
+    for name in ('transport.a', 'transport.b'):
+        async def read_devices_async(transport=transports[name]):
+            reads.append(transport.transport_name)
+            if len(reads) >= 4:
+                gateway._Protocol_Gateway__running = False
+            return [(transport, {'reads' : len(reads)})]
+
+        transports[name].read_devices_async = read_devices_async
+        transports[name].connected = True
+
+    written : list[tuple[str, dict]] = []
+    async def write_data_async(data, from_transport):
+        written.append((from_transport.transport_name, data))
+    transports['transport.c'].write_data_async = write_data_async
+
+    gateway._Protocol_Gateway__running = True
+    asyncio.run(asyncio.wait_for(gateway.read_bus_async([transports['transport.a'], transports['transport.b']]), 2))
+
+    assert reads == ['transport.a', 'transport.b', 'transport.a', 'transport.b']
+    assert written[0] == ('transport.a', {'reads' : 1})
+    assert len(written) == 4
+
+
+class fake_async_client:
+    ''' records requests, and the loop they ran on '''
+    connected : bool = True
+
+    def __init__(self):
+        self.requests : list[tuple] = []
+
+    async def write_register(self, register, value, **kwargs):
+        self.requests.append(('write', register, value, asyncio.get_running_loop()))
+        return registers_response([value])
+
+    async def read_holding_registers(self, start, count, **kwargs):
+        self.requests.append(('read', start, count, asyncio.get_running_loop()))
+        return registers_response([0] * count)
+
+
+class no_client:
+    ''' the blocking client must not be used while the async client owns the connection '''
+    def __getattr__(self, name):
+        raise AssertionError("blocking client used: " + name)
+
+
+def test_writes_use_async_connection(create_transport):
+    transport = create_transport(fake=False, write_enabled='true')
+    transport.client = no_client()
+    transport.async_client = fake_async_client()
+
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    transport._async_loop = loop
+    try:
+        #ie: a write from mqtt's thread, while the asyncio engine is reading
+        assert transport.write_register(5, 1, registry_type=Registry_Type.HOLDING).registers == [1]
+        assert transport.read_registers(5, 1, registry_type=Registry_Type.HOLDING).registers == [0]
+        assert [request[:3] for request in transport.async_client.requests] == [('write', 5, 1), ('read', 5, 1)]
+        assert all(request[3] is loop for request in transport.async_client.requests)
+
+        #blocking on the event loop itself would deadlock
+        async def blocking():
+            transport.write_register(5, 1)
+        with pytest.raises(RuntimeError):
+            asyncio.run_coroutine_threadsafe(blocking(), loop).result(2)
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(2)
+        loop.close()
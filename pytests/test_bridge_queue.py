@@ -0,0 +1,54 @@
+import sys
+import os
+import threading
+
+#move up a folder for tests
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))) 
+
+from classes.bridge_queue import bridge_queue, Queue_Policy
+
+
+def test_policy_from_string():
+    assert Queue_Policy.fromString("drop") == Queue_Policy.DROP_OLDEST
+    assert Queue_Policy.fromString(" latest ") == Queue_Policy.COALESCE
+    assert Queue_Policy.fromString("block") == Queue_Policy.BLOCK
+
+def test_drop_oldest(create_stub_transport):
+    source = create_stub_transport("transport.0")
+    queue = bridge_queue(create_stub_transport("transport.mqtt"), Queue_Policy.DROP_OLDEST, max_size=2)
+    for i in range(3):
+        queue.put(source, {"counter" : i})
+
+    assert queue.dropped == 1
+    assert queue.max_depth == 2
+    assert queue.get(timeout=0)[1] == {"counter" : 1}
+    assert queue.get(timeout=0)[1] == {"counter" : 2}
+    assert queue.get(timeout=0) is None
+
+def test_coalesce(create_stub_transport):
+    source_a = create_stub_transport("transport.a")
+    source_b = create_stub_transport("transport.b")
+    queue = bridge_queue(create_stub_transport("transport.mqtt"), Queue_Policy.COALESCE)
+    queue.put(source_a, {"voltage" : 1, "current" : 2})
+    queue.put(source_b, {"voltage" : 10})
+    queue.put(source_a, {"voltage" : 3})
+
+    assert queue.depth == 2
+    assert queue.coalesced == 1
+    assert queue.get(timeout=0) == (source_a, {"voltage" : 3, "current" : 2})
+    assert queue.get(timeout=0) == (source_b, {"voltage" : 10})
+
+def test_block(create_stub_transport):
+    source = create_stub_transport("transport.0")
+    queue = bridge_queue(create_stub_transport("transport.mqtt"), Queue_Policy.BLOCK, max_size=1)
+    queue.put(source, {"counter" : 0})
+
+    thread = threading.Thread(target=queue.put, args=(source, {"counter" : 1}))
+    thread.start()
+    thread.join(timeout=0.1)
+    assert thread.is_alive() #waiting for room
+
+    assert queue.get(timeout=1)[1] == {"counter" : 0}
+    thread.join(timeout=1)
+    assert queue.get(timeout=1)[1] == {"counter" : 1}
+    assert queue.dropped == 0
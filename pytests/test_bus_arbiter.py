@@ -0,0 +1,79 @@
+import sys
+import os
+import threading
+import time
+
+
+#move up a folder for tests
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from classes.bus_arbiter import bus_arbiter, Bus_Priority
+
+
+def wait_for_queue(arbiter : bus_arbiter, depth : int):
+    deadline = time.monotonic() + 2
+    while arbiter.queue_depth < depth and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+
+def test_priority_order():
+    arbiter = bus_arbiter('test')
+    granted : list[str] = []
+
+    def request(name : str, priority : Bus_Priority):
+        with arbiter.request(priority):
+            granted.append(name)
+
+    arbiter.acquire() #hold the bus while requests queue up
+    threads = []
+    for name, priority in (('read 1', Bus_Priority.READ), ('read 2', Bus_Priority.READ), ('write', Bus_Priority.WRITE)):
+        thread = threading.Thread(target=request, args=(name, priority))
+        thread.start()
+        threads.append(thread)
+        wait_for_queue(arbiter, len(threads))
+
+    arbiter.release()
+    for thread in threads:
+        thread.join(2)
+
+    assert granted == ['write', 'read 1', 'read 2']
+    assert arbiter.requests == 4 and arbiter.waits == 3
+    assert arbiter.queue_depth == 0
+
+
+def test_exclusive():
+    arbiter = bus_arbiter('test')
+    holders : list[int] = [0]
+    overlaps : list[int] = []
+
+    def hold():
+        for _ in range(20):
+            with arbiter.request():
+                holders[0] += 1
+                if holders[0] > 1:
+                    overlaps.append(holders[0])
+                time.sleep(0.0005)
+                holders[0] -= 1
+
+    threads = [threading.Thread(target=hold) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert not overlaps
+    assert arbiter.requests == 80
+    assert 0 < arbiter.utilization <= 1
+
+
+def test_shared_per_bus():
+    assert bus_arbiter.get('/dev/ttyTEST0') is bus_arbiter.get('/dev/ttyTEST0')
+    assert bus_arbiter.get('/dev/ttyTEST0') is not bus_arbiter.get('/dev/ttyTEST1')
+
+
+def test_keyed_by_bus_id(create_transport):
+    #same port at different bauds is still one bus; the worker and the arbiter agree
+    first = create_transport(rtu=True, baudrate=9600)
+    second = create_transport(rtu=True, baudrate=19200)
+    assert first.bus_id == second.bus_id == '/dev/ttyTEST0'
+    assert first.arbiter is second.arbiter is bus_arbiter.get(first.bus_id)
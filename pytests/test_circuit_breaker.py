@@ -0,0 +1,54 @@
+import sys
+import os
+
+
+#move up a folder for tests
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from classes.circuit_breaker import circuit_breaker, Breaker_State
+from classes.protocol_settings import Registry_Type
+
+
+def test_states():
+    breaker = circuit_breaker('test', failure_threshold=2, cool_down=10)
+    assert breaker.allow(0)
+    assert not breaker.failure(0)
+    assert breaker.failure(1) #opens
+    assert breaker.state == Breaker_State.OPEN
+
+    assert not breaker.allow(5)
+    assert breaker.allow(11) #one probe
+    assert breaker.state == Breaker_State.HALF_OPEN
+    assert not breaker.allow(12)
+
+    assert breaker.failure(12) #failed probe opens again
+    assert not breaker.allow(20)
+    assert breaker.allow(22)
+    breaker.success()
+    assert breaker.state == Breaker_State.CLOSED and breaker.allow(23)
+
+    assert breaker.trips == 2 and breaker.skipped == 3
+    assert breaker.failure_rate == 0.75
+
+
+def test_dead_device(create_transport):
+    transport = create_transport(breaker_threshold=2)
+    transport.respond = lambda start, count, registry_type: transport.error_response()
+    ranges = [(0, 10), (20, 10), (40, 10)]
+
+    assert transport.read_modbus_registers(ranges) == {}
+    assert len(transport.requests) == 4 #two ranges, until the device breaker opens
+    assert transport.device_breaker.state == Breaker_State.OPEN
+    assert transport.range_breakers[(Registry_Type.INPUT, 0, 10)].state == Breaker_State.OPEN
+    assert (Registry_Type.INPUT, 40, 10) not in transport.range_breakers
+
+    transport.read_modbus_registers(ranges)
+    assert len(transport.requests) == 4 #costs nothing while open
+
+    #cool down passed; one probe
+    transport.device_breaker.opened_time -= 61
+    for breaker in transport.range_breakers.values():
+        breaker.opened_time -= 61
+
+    transport.read_modbus_registers(ranges)
+    assert len(transport.requests) == 5
@@ -0,0 +1,62 @@
+import sys
+import os
+import glob
+import random
+import pytest
+
+
+#move up a folder for tests
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from classes.protocol_settings import protocol_settings, Registry_Type, Data_Type
+
+search_pattern = os.path.join("protocols", '**', '*.json')
+files = glob.glob(search_pattern, recursive=True)
+protocols = [os.path.splitext(os.path.basename(f))[0] for f in files]
+
+
+@pytest.mark.parametrize("protocol", protocols)
+def test_decoder_plan_matches_process_register_ushort(protocol : str):
+    ''' compiled decoders must give exactly the same values as the per entry decode '''
+    protocolSettings : protocol_settings = protocol_settings(protocol)
+    rand = random.Random(protocol)
+
+    for registry_type in Registry_Type:
+        registry_map = protocolSettings.get_registry_map(registry_type)
+        if not registry_map:
+            continue
+
+        for special in (None, 0, 0xFFFF, 0x8000):
+            registry : dict[int, int] = {}
+            for entry in registry_map:
+                for register in (entry.register, entry.register + 1):
+                    registry[register] = special if special is not None else rand.randint(0, 0xFFFF)
+
+            for entry in registry_map: #keep text valid utf-8
+                if entry.data_type == Data_Type.ASCII:
+                    registry[entry.register] = 0x4142
+
+            assert_matches_legacy(protocolSettings, registry, registry_map)
+
+            #32 bit values with the second register missing; falls back to per entry decoding
+            del registry[max(registry)]
+            assert_matches_legacy(protocolSettings, registry, registry_map)
+
+
+def assert_matches_legacy(protocolSettings : protocol_settings, registry : dict[int, int], registry_map : list):
+    expected : dict = {}
+    for entry in registry_map:
+        if entry.register in registry and not entry.concatenate:
+            expected[entry.variable_name] = protocolSettings.process_register_ushort(registry, entry)
+
+    info = protocolSettings.process_registery(registry, registry_map)
+    for name, value in expected.items():
+        assert info[name] == value and type(info[name]) == type(value), name
+
+
+def test_blocks():
+    protocolSettings : protocol_settings = protocol_settings('eg4_v58')
+    registry_map = protocolSettings.get_registry_map(Registry_Type.INPUT)
+    blocks, _ = protocolSettings.get_decoders(registry_map)
+    assert blocks
+    assert sum(len(block[5]) for block in blocks) > len(registry_map) / 2
@@ -0,0 +1,88 @@
+import sys
+import os
+
+#move up a folder for tests
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))) 
+
+from classes.delta_filter import delta_filter
+from classes.protocol_settings import Registry_Type
+from conftest import modbus_section
+
+
+def test_changes_only():
+    delta = delta_filter(full_refresh_interval=60)
+    assert delta.filter({"serial_number" : "abc", "pv1_voltage" : 120.0}, now=1) == {"serial_number" : "abc", "pv1_voltage" : 120.0}
+    assert delta.filter({"serial_number" : "abc", "pv1_voltage" : 120.0}, now=2) == {}
+    assert delta.filter({"serial_number" : "abc", "pv1_voltage" : 121.5}, now=3) == {"pv1_voltage" : 121.5}
+
+def test_full_refresh():
+    delta = delta_filter(full_refresh_interval=60)
+    info = {"serial_number" : "abc", "pv1_voltage" : 120.0}
+    delta.filter(info, now=1)
+    assert delta.filter(info, now=30) == {}
+    assert delta.filter(info, now=61) == info
+    assert delta.filter(info, now=62) == {}
+
+def test_disabled():
+    delta = delta_filter(changes_only=False)
+    info = {"pv1_voltage" : 120.0}
+    assert delta.filter(info, now=1) == info
+    assert delta.filter(info, now=2) == info
+
+def test_deadband():
+    delta = delta_filter(changes_only=False, full_refresh_interval=60, deadbands={"pv1_voltage" : (0.5, False), "soc" : (2, True)})
+    delta.filter({"pv1_voltage" : 120.0, "soc" : 50, "state" : "on"}, now=1)
+
+    #changes inside deadband are suppressed, other variables pass through
+    assert delta.filter({"pv1_voltage" : 120.4, "soc" : 51, "state" : "on"}, now=2) == {"state" : "on"}
+    #deadband is relative to the last forwarded value
+    assert delta.filter({"pv1_voltage" : 120.6, "soc" : 49, "state" : "on"}, now=3) == {"pv1_voltage" : 120.6, "state" : "on"}
+    assert delta.filter({"pv1_voltage" : 120.6, "soc" : 48.9, "state" : "on"}, now=4) == {"soc" : 48.9, "state" : "on"}
+
+def test_invalidate():
+    delta = delta_filter(full_refresh_interval=60)
+    delta.filter({"serial_number" : "abc", "pv1_voltage" : 120.0}, now=1)
+    delta.invalidate({"pv1_voltage" : 120.0})
+    assert delta.filter({"serial_number" : "abc", "pv1_voltage" : 120.0}, now=2) == {"pv1_voltage" : 120.0}
+
+def test_dropped_values_are_forwarded_again(create_gateway):
+    gateway = create_gateway(modbus_section('transport.a', 1, bridge='transport.b', changes_only='true')
+                             + modbus_section('transport.b', 2, queue_policy='drop_oldest', queue_size=1))
+    transports = {transport.transport_name : transport for transport in gateway._Protocol_Gateway__transports}
+    source = transports['transport.a']
+    queue = gateway._Protocol_Gateway__bridge_queues['transport.b']
+
+    gateway.bridge_data(source, {"serial_number" : "abc", "pv1_voltage" : 120.0})
+    gateway.bridge_data(source, {"serial_number" : "abc", "pv1_voltage" : 121.0}) #drops the first read
+    assert queue.dropped == 1
+    assert queue.get(timeout=0) == (source, {"pv1_voltage" : 121.0})
+
+    #serial_number was never delivered; the filter forwards it again
+    gateway.bridge_data(source, {"serial_number" : "abc", "pv1_voltage" : 121.0})
+    assert queue.get(timeout=0) == (source, {"serial_number" : "abc"})
+
+def test_deadband_column(create_protocol, create_gateway):
+    protocolSettings = create_protocol('deadband_test', maps={'input_registry_map' : 'variable name,documented name,data type,register,unit,values,deadband\n'
+                                                                                    'pv1_voltage,,USHORT,1,0.1V,,0.5\n'
+                                                                                    'soc,,USHORT,2,%,,2%\n'
+                                                                                    'pv1_power,,USHORT,3,W,,abc\n'
+                                                                                    'state,,USHORT,4,,,\n'})
+    entries = {entry.variable_name : entry for entry in protocolSettings.get_registry_map(Registry_Type.INPUT)}
+    assert (entries['pv1_voltage'].deadband, entries['pv1_voltage'].deadband_percent) == (0.5, False)
+    assert (entries['soc'].deadband, entries['soc'].deadband_percent) == (2, True)
+    assert (entries['pv1_power'].deadband, entries['pv1_power'].deadband_percent) == (0, False) #invalid; ignored
+    assert (entries['state'].deadband, entries['state'].deadband_percent) == (0, False)
+
+    #map to filter; deadbands apply without changes_only
+    gateway = create_gateway(modbus_section('transport.a', 1))
+    transport = gateway._Protocol_Gateway__transports[0]
+    transport.protocolSettings = protocolSettings
+    gateway.build_filters()
+
+    delta = gateway._Protocol_Gateway__filters['transport.a']
+    assert delta.deadbands == {'pv1_voltage' : (0.5, False), 'soc' : (2, True)}
+    assert not delta.changes_only
+
+    info = {'pv1_voltage' : 120.0, 'soc' : 50, 'pv1_power' : 1000, 'state' : 1}
+    assert gateway.filter_data(transport, info) == info
+    assert gateway.filter_data(transport, {'pv1_voltage' : 120.4, 'soc' : 51, 'pv1_power' : 1000, 'state' : 1}) == {'pv1_power' : 1000, 'state' : 1}
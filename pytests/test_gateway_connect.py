@@ -0,0 +1,56 @@
+import sys
+import os
+import time
+
+
+#move up a folder for tests
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from conftest import modbus_section
+from classes.transports.modbus_tcp import modbus_tcp
+
+
+def slow_connect(connects : dict[str, tuple[float, float]], fail : set[str] = frozenset()):
+    ''' connect that takes 0.2s; records (start, end) per transport '''
+    def connect(self):
+        start = time.monotonic()
+        time.sleep(0.2)
+        connects[self.transport_name] = (start, time.monotonic())
+        if self.transport_name in fail:
+            raise ConnectionError("unreachable")
+        self.connected = True
+
+    return connect
+
+
+def overlap(first : tuple[float, float], second : tuple[float, float]) -> bool:
+    return first[0] < second[1] and second[0] < first[1]
+
+
+def test_buses_connect_in_parallel(create_gateway, monkeypatch):
+    connects : dict[str, tuple[float, float]] = {}
+    monkeypatch.setattr(modbus_tcp, 'connect', slow_connect(connects))
+
+    start = time.monotonic()
+    create_gateway(modbus_section('transport.a', 1) + modbus_section('transport.b', 2) + modbus_section('transport.c', 3))
+    assert time.monotonic() - start < 0.5 #three buses, not 0.6s one after another
+
+    assert overlap(connects['transport.a'], connects['transport.b'])
+    assert overlap(connects['transport.b'], connects['transport.c'])
+
+
+def test_same_bus_connects_serially(create_gateway, monkeypatch):
+    connects : dict[str, tuple[float, float]] = {}
+    monkeypatch.setattr(modbus_tcp, 'connect', slow_connect(connects))
+
+    create_gateway(modbus_section('transport.a', 1) + modbus_section('transport.b', 1))
+    assert not overlap(connects['transport.a'], connects['transport.b'])
+
+
+def test_failed_connect_doesnt_stop_others(create_gateway, monkeypatch):
+    connects : dict[str, tuple[float, float]] = {}
+    monkeypatch.setattr(modbus_tcp, 'connect', slow_connect(connects, fail={'transport.a'}))
+
+    gateway = create_gateway(modbus_section('transport.a', 1) + modbus_section('transport.b', 1) + modbus_section('transport.c', 2))
+    connected = {transport.transport_name : transport.connected for transport in gateway._Protocol_Gateway__transports}
+    assert connected == {'transport.a' : False, 'transport.b' : True, 'transport.c' : True}
@@ -0,0 +1,62 @@
+import sys
+import os
+
+
+#move up a folder for tests
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from conftest import modbus_section
+from classes.protocol_settings import Registry_Type
+
+
+def test_instances_dont_share_state(create_gateway):
+    first = create_gateway(modbus_section('transport.a', 1, bridge='transport.b') + modbus_section('transport.b', 2), 'first.cfg')
+    second = create_gateway(modbus_section('transport.c', 3), 'second.cfg')
+
+    assert [transport.transport_name for transport in first._Protocol_Gateway__transports] == ['transport.a', 'transport.b']
+    assert [transport.transport_name for transport in second._Protocol_Gateway__transports] == ['transport.c']
+    assert 'transport.a' not in second._Protocol_Gateway__bridge_routes
+    assert second._Protocol_Gateway__filters is not first._Protocol_Gateway__filters
+
+
+def record_writes(transports) -> list[tuple[str, dict, str]]:
+    ''' replaces write_data; (to transport, data, from transport) '''
+    writes : list[tuple[str, dict, str]] = []
+    for transport in transports:
+        transport.write_data = lambda data, from_transport, name=transport.transport_name: writes.append((name, data, from_transport.transport_name))
+    return writes
+
+
+def test_csv_and_broadcast_bridges(create_gateway):
+    gateway = create_gateway(modbus_section('transport.a', 1, bridge='transport.b, transport.c')
+                             + modbus_section('transport.b', 2)
+                             + modbus_section('transport.c', 3)
+                             + modbus_section('transport.d', 4, bridge='broadcast'))
+    routes = {name : [transport.transport_name for transport in to_transports] for name, to_transports in gateway._Protocol_Gateway__bridge_routes.items()}
+
+    assert routes['transport.a'] == ['transport.b', 'transport.c']
+    assert routes['transport.b'] == [] #bridges are one way for data
+    assert routes['transport.d'] == ['transport.a', 'transport.b', 'transport.c']
+
+    transports = {transport.transport_name : transport for transport in gateway._Protocol_Gateway__transports}
+    writes = record_writes(transports.values())
+    gateway.bridge_data(transports['transport.a'], {'soc' : 50})
+    assert writes == [('transport.b', {'soc' : 50}, 'transport.a'), ('transport.c', {'soc' : 50}, 'transport.a')]
+
+
+def test_messages_reverse_route_to_named_transport(create_gateway):
+    gateway = create_gateway(modbus_section('transport.a', 1, bridge='transport.mqtt')
+                             + modbus_section('transport.b', 2, bridge='transport.mqtt')
+                             + modbus_section('transport.mqtt', 3))
+    transports = {transport.transport_name : transport for transport in gateway._Protocol_Gateway__transports}
+    entry = transports['transport.a'].protocolSettings.get_registry_map(Registry_Type.HOLDING)[0]
+    writes = record_writes(transports.values())
+
+    #a write topic belongs to one device; only that transport is written
+    gateway.on_message(transports['transport.mqtt'], entry, '1', 'transport.b')
+    assert writes == [('transport.b', {entry.variable_name : '1'}, 'transport.mqtt')]
+
+    #unnamed; every bridged transport
+    writes.clear()
+    gateway.on_message(transports['transport.mqtt'], entry, '1')
+    assert [name for name, data, from_name in writes] == ['transport.a', 'transport.b']
@@ -0,0 +1,60 @@
+import sys
+import os
+
+
+#move up a folder for tests
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from classes.protocol_settings import Registry_Type
+
+
+def create_cache_device(create_device):
+    return create_device('cache_test', '{"transport" : "modbus_tcp", "send_input_register" : false}',
+                         {'holding_registry_map' : 'variable name,documented name,data type,register,unit,values,writable\n'
+                                                   'grid_charge,,1BIT,1.b0,,0~1,W\n'
+                                                   'eps_enable,,1BIT,1.b1,,0~1,W\n'
+                                                   'charge_rate,,USHORT,2,,0~1000,W\n'},
+                         registers={1 : 0b0001, 2 : 500}, write_enabled='true', holding_refresh_interval=60)
+
+
+def test_holding_cache(create_device):
+    transport = create_cache_device(create_device)
+
+    assert transport.read_data()['charge_rate'] == 500
+    assert len(transport.requests) == 1
+
+    #served from the shadow copy until holding_refresh_interval
+    assert transport.read_data()['eps_enable'] == 0
+    assert len(transport.requests) == 1
+
+    #read modify write from the cache, and written through
+    transport.write_variable(transport.protocolSettings.get_variable_entry('eps_enable', Registry_Type.HOLDING), "1")
+    assert len(transport.requests) == 1
+    assert transport.registers[1] == 0b0011
+    assert transport.holding_cache[1] == 0b0011
+    assert transport.read_data()['eps_enable'] == 1
+
+    #refresh interval elapsed
+    transport._holding_read_time -= 61
+    transport.read_data()
+    assert len(transport.requests) == 2
+
+
+def test_failed_write(create_device):
+    transport = create_cache_device(create_device)
+    transport.read_data()
+    transport.fail_writes = True
+
+    transport.write_variable(transport.protocolSettings.get_variable_entry('eps_enable', Registry_Type.HOLDING), "1")
+    assert transport.registers[1] == 0b0001
+    assert 1 not in transport.holding_cache #re-read before the next write
+
+
+def test_unconfirmed_write(create_device):
+    transport = create_cache_device(create_device)
+    transport.read_data()
+
+    #no response; ie: writing not supported by the transport
+    transport.write_register = lambda register, value, **kwargs: None
+    transport.write_variable(transport.protocolSettings.get_variable_entry('charge_rate', Registry_Type.HOLDING), "100")
+    assert 2 not in transport.holding_cache
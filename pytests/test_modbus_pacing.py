@@ -0,0 +1,50 @@
+import sys
+import os
+
+
+#move up a folder for tests
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from classes.transports.modbus_base import modbus_pacing
+
+
+def test_floor():
+    assert modbus_pacing(baudrate=9600).floor == 3.5 * 11 / 9600
+    assert modbus_pacing(baudrate=115200).floor == 0.00175
+    assert modbus_pacing().floor == 0
+
+
+def test_shrink_and_backoff():
+    pacing = modbus_pacing(0.85, baudrate=9600)
+    for _ in range(30):
+        pacing.success(0.05)
+
+    assert abs(pacing.delay - pacing.floor) < 0.0001
+    assert abs(pacing.latency - 0.05) < 0.0001
+
+    pacing.failure()
+    assert pacing.delay == 0.1 #backs off from the response time
+    pacing.failure()
+    assert pacing.delay == 0.2
+    assert pacing.errors == 2 and pacing.requests == 32
+
+    for _ in range(20):
+        pacing.failure()
+    assert pacing.delay == pacing.max_delay
+
+
+def test_read_steps(create_transport):
+    transport = create_transport(batch_delay=0.01, adaptive_delay='true')
+
+    #times out on the first read
+    def respond(start, count, registry_type):
+        if len(transport.requests) == 1:
+            return transport.error_response()
+        return transport.registers_response([start] * count)
+
+    transport.respond = respond
+
+    assert transport.read_modbus_registers([(0, 2), (10, 2)]) == {0 : 0, 1 : 0, 10 : 10, 11 : 10}
+    assert len(transport.requests) == 3
+    assert transport.pacing.errors == 1
+    assert transport.modbus_delay == transport.pacing.delay < 0.02
@@ -0,0 +1,62 @@
+import sys
+import os
+
+
+#move up a folder for tests
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from classes.transports.modbus_rtu import modbus_rtu
+from classes.protocol_settings import Registry_Type
+from conftest import error_response
+
+
+def test_parse_addresses():
+    assert modbus_rtu.parse_addresses("1") == [1]
+    assert modbus_rtu.parse_addresses("1, 3-5,x0A") == [1, 3, 4, 5, 10]
+    assert modbus_rtu.parse_addresses("") == [0]
+
+
+def test_devices(create_transport):
+    transport = create_transport(rtu=True, address='1-3', serial_number='abc', send_holding_register='false')
+
+    devices = transport.get_devices()
+    assert [device.addresses for device in devices] == [[1], [2], [3]]
+    assert [device.device_identifier for device in devices] == ['abc_1', 'abc_2', 'abc_3']
+    assert [device.transport_name for device in devices] == ['transport.test.1', 'transport.test.2', 'transport.test.3']
+
+    results = transport.read_devices()
+    assert [device for device, info in results] == devices
+    for device, info in results:
+        assert info
+
+    #one request from each device in turn
+    assert [address for address, start, count in transport.requests[:6]] == [1, 2, 3, 1, 2, 3]
+    assert transport.requests[0][1] == transport.requests[1][1] == transport.requests[2][1]
+
+
+def test_single_address(create_transport):
+    transport = create_transport(rtu=True, address=7)
+
+    assert transport.addresses == [7]
+    assert transport.get_devices() == [transport]
+
+
+def test_device_state(create_transport):
+    transport = create_transport(rtu=True, address='1-2', adaptive_delay='true', breaker_threshold=1)
+    first, second = transport.get_devices()
+    second.respond = lambda start, count, registry_type: error_response() #only the second device fails
+
+    first.read_modbus_registers([(0, 2)], registry_type=Registry_Type.HOLDING)
+    second.read_modbus_registers([(0, 2)], registry_type=Registry_Type.HOLDING)
+
+    assert first.holding_cache == {0 : 0, 1 : 0}
+    assert second.holding_cache == {}
+    assert first.device_breaker.total_failures == 0 and second.device_breaker.total_failures == 1
+    assert first.pacing.errors == 0 and second.pacing.errors == 1
+    assert first.range_breakers is not second.range_breakers
+    assert first.unreadable_registers is not second.unreadable_registers
+
+    #logged under their own names
+    assert first._log is not second._log
+    assert first._log.name.endswith('[transport.test.1]') and second._log.name.endswith('[transport.test.2]')
+    assert first.bridges is not second.bridges
@@ -0,0 +1,93 @@
+import sys
+import os
+import time
+
+
+#move up a folder for tests
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from classes.protocol_settings import protocol_settings, Registry_Type
+
+
+def create_tier_device(create_device):
+    return create_device('tier_test', '{"transport" : "modbus_tcp", "send_holding_register" : false}',
+                         {'input_registry_map' : 'variable name,documented name,data type,register,unit,values,poll\n'
+                                                 'pv_power,,USHORT,1,W,,1s\n'
+                                                 'battery_voltage,,USHORT,2,0.1V,,\n'
+                                                 'rated_power,,USHORT,100,W,,once\n'
+                                                 'firmware,,USHORT,101,,,5m\n'},
+                         read_interval=10)
+
+
+def test_poll_column():
+    assert protocol_settings.parse_poll_interval('1s') == 1
+    assert protocol_settings.parse_poll_interval('500ms') == 0.5
+    assert protocol_settings.parse_poll_interval('5m') == 300
+    assert protocol_settings.parse_poll_interval('once') == -1
+    assert protocol_settings.parse_poll_interval('30') == 30
+
+
+def test_poll_tiers(create_device):
+    transport = create_tier_device(create_device)
+    tiers = transport.protocolSettings.get_registry_tiers(Registry_Type.INPUT)
+    assert tiers == {1 : [(1, 1)], 0 : [(2, 1)], -1 : [(100, 1)], 300 : [(101, 1)]}
+
+    #reads as often as the fastest tier
+    assert transport.read_interval == 1
+    assert transport.tier_base_interval == 10
+
+    def due(now):
+        return transport.get_read_ranges(Registry_Type.INPUT, transport.get_due_poll_intervals(Registry_Type.INPUT, now))
+
+    assert due(1000) == transport.protocolSettings.get_registry_ranges(Registry_Type.INPUT) #first read; everything
+    assert due(1001) == [(1, 1)]
+    assert due(1010) == [(1, 2)] #fast and default tiers, planned together
+    assert due(1300) == [(1, 2), (101, 1)]
+
+
+def test_single_tier_maps(create_device, monkeypatch):
+    #holding registers have no poll column; input registers have a fast tier
+    transport = create_device('tier_mixed_test', maps={'input_registry_map' : 'variable name,documented name,data type,register,unit,values,poll\n'
+                                                                         'pv_power,,USHORT,1,W,,1s\n',
+                                                   'holding_registry_map' : 'variable name,documented name,data type,register,unit,values\n'
+                                                                           'charge_current,,USHORT,5,A,\n'},
+                              read_interval=10)
+    assert transport.read_interval == 1
+
+    def due(registry_type, now):
+        return transport.get_read_ranges(registry_type, transport.get_due_poll_intervals(registry_type, now))
+
+    assert due(Registry_Type.HOLDING, 1000) == [(5, 1)]
+    assert due(Registry_Type.HOLDING, 1001) == [] #every read_interval, not every fast tick
+    assert due(Registry_Type.HOLDING, 1010) == [(5, 1)]
+
+    #read_data, with both types enabled; holding is read on the read_interval ticks only
+    transport._last_tier_reads.clear()
+    for tick in range(11):
+        monkeypatch.setattr(time, 'monotonic', lambda: 2000.0 + tick)
+        transport.read_data()
+
+    reads = [start for address, start, count in transport.requests]
+    assert reads.count(1) == 11
+    assert reads.count(5) == 2 #ticks 0 and 10
+
+
+def test_same_tier_maps(create_device):
+    transport = create_device('tier_same_test', maps={'input_registry_map' : 'variable name,documented name,data type,register,unit,values,poll\n'
+                                                                        'energy_today,,USHORT,1,kWh,,60s\n'
+                                                                        'energy_total,,USHORT,2,kWh,,60s\n',
+                                                  'holding_registry_map' : 'variable name,documented name,data type,register,unit,values,poll\n'
+                                                                          'rated_power,,USHORT,5,W,,once\n'},
+                              read_interval=10)
+    assert transport.read_interval == 10
+
+    def due(registry_type, now):
+        return transport.get_read_ranges(registry_type, transport.get_due_poll_intervals(registry_type, now))
+
+    assert due(Registry_Type.INPUT, 1000) == [(1, 2)]
+    assert due(Registry_Type.INPUT, 1010) == []
+    assert due(Registry_Type.INPUT, 1060) == [(1, 2)]
+
+    assert due(Registry_Type.HOLDING, 1000) == [(5, 1)]
+    assert due(Registry_Type.HOLDING, 1010) == []
+    assert due(Registry_Type.HOLDING, 5000) == []
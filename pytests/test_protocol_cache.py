@@ -0,0 +1,39 @@
+import sys
+import os
+import time
+
+
+#move up a folder for tests
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from classes.protocol_settings import protocol_settings, Registry_Type
+
+
+def write_protocol(settings_dir, csv : str):
+    with open(os.path.join(settings_dir, 'cache_test.json'), 'w') as f:
+        f.write('{"transport" : "modbus_tcp"}')
+
+    with open(os.path.join(settings_dir, 'cache_test.input_registry_map.csv'), 'w') as f:
+        f.write(csv)
+
+
+def test_cache_reload_and_invalidate(tmp_path):
+    settings_dir = str(tmp_path / 'protocols')
+    cache_dir = str(tmp_path / 'cache')
+    os.makedirs(settings_dir)
+
+    write_protocol(settings_dir, 'variable name,documented name,data type,register,unit,values\npv1_voltage,,USHORT,1,0.1V,\n')
+    first = protocol_settings('cache_test', settings_dir=settings_dir, cache_dir=cache_dir)
+    assert os.listdir(cache_dir)
+
+    cached = protocol_settings('cache_test', settings_dir=settings_dir, cache_dir=cache_dir)
+    assert cached.transport == 'modbus_tcp'
+    assert [e.variable_name for e in cached.get_registry_map(Registry_Type.INPUT)] == ['pv1_voltage']
+    assert cached.get_registry_ranges(Registry_Type.INPUT) == first.get_registry_ranges(Registry_Type.INPUT)
+    assert cached.get_registry_map(Registry_Type.HOLDING) == []
+
+    #changed source invalidates the cache
+    time.sleep(0.01)
+    write_protocol(settings_dir, 'variable name,documented name,data type,register,unit,values\npv1_voltage,,USHORT,1,0.1V,\npv2_voltage,,USHORT,2,0.1V,\n')
+    changed = protocol_settings('cache_test', settings_dir=settings_dir, cache_dir=cache_dir)
+    assert [e.variable_name for e in changed.get_registry_map(Registry_Type.INPUT)] == ['pv1_voltage', 'pv2_voltage']
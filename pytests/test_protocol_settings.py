@@ -7,7 +7,7 @@ import glob
 #move up a folder for tests
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))) 
 
-from classes.protocol_settings import protocol_settings
+from classes.protocol_settings import protocol_settings, registry_map_entry, Registry_Type, Data_Type
 
 # List of protocols to test
 # Create the search pattern to find .json files recursively
@@ -24,3 +24,49 @@ def test_protocol_setting(protocol : str):
     print(protocol)
     protocolSettings : protocol_settings = protocol_settings(protocol)
 
+
+def test_indexes():
+    protocolSettings : protocol_settings = protocol_settings('eg4_v58')
+    for registry_type in Registry_Type:
+        registry_map = protocolSettings.get_registry_map(registry_type)
+        for entry in registry_map:
+            first = next(e for e in registry_map if e.variable_name == entry.variable_name)
+            assert protocolSettings.get_variable_entry(entry.variable_name, registry_type) is first
+            assert entry in protocolSettings.get_register_entries(entry.register, registry_type)
+
+        assert protocolSettings.get_variable_entry('not_a_variable', registry_type) is None
+
+    #replaced maps are reindexed
+    entry = protocolSettings.get_registry_map(Registry_Type.INPUT)[0]
+    protocolSettings.registry_map[Registry_Type.INPUT] = [entry]
+    assert protocolSettings.get_register_entries(entry.register, Registry_Type.INPUT) == [entry]
+
+def test_flag_codes():
+    protocolSettings : protocol_settings = protocol_settings('eg4_v58')
+    bits, multibits = protocolSettings.compile_flag_codes({"b0" : "StandBy", "b0&b1" : "Operational", "b1" : "Error", "b01" : "ignored"})
+    assert bits == [(0, 1, "StandBy"), (1, 2, "Error")]
+    assert multibits == [(3, "Operational")]
+
+    protocolSettings.codes["flag_test_codes"] = {"b0" : "StandBy", "b0&b1" : "Operational", "b9" : "Fault"}
+    entry = registry_map_entry(registry_type=Registry_Type.ZERO, register=1, register_bit=0, register_byte=0,
+                              variable_name="flag_test", documented_name="flag_test", unit='', unit_mod=1, concatenate=False,
+                              concatenate_registers=(), values=(), data_type=Data_Type._16BIT_FLAGS)
+
+    assert protocolSettings.process_register_bytes({1 : bytes([0b11, 0b10])}, entry) == "StandBy,Fault,Operational"
+    assert protocolSettings.process_register_ushort({1 : 0b11}, entry) == "StandBy"
+
+def test_code_tables():
+    protocolSettings : protocol_settings = protocol_settings('eg4_v58')
+    protocolSettings.codes["mode_test_codes"] = {"0" : "Off", "1" : "On", "01" : "unreachable", "-1" : "Error", "b2" : "Flag"}
+    forward, reverse = protocolSettings.get_code_tables("mode_test_codes")
+    assert forward == {0 : "Off", 1 : "On", -1 : "Error"}
+
+    assert protocolSettings.decode_code(forward, 1.7) == "On" #integer part, same as str(int(value))
+    assert protocolSettings.decode_code(forward, 5.0) == 5.0
+    assert protocolSettings.decode_code(forward, "text") == "text"
+
+    entry = registry_map_entry(registry_type=Registry_Type.HOLDING, register=1, register_bit=0, register_byte=0,
+                              variable_name="mode", documented_name="mode_test", unit='', unit_mod=1, concatenate=False,
+                              concatenate_registers=(), values=())
+    assert protocolSettings.encode_code(entry, "On") == "1"
+    assert protocolSettings.encode_code(entry, "2") == "2"
@@ -0,0 +1,68 @@
+import sys
+import os
+
+
+#move up a folder for tests
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from classes.protocol_settings import protocol_settings, registry_map_entry, Registry_Type, Data_Type, WriteMode
+
+
+def entry(register : int, data_type : Data_Type = Data_Type.USHORT, write_mode : WriteMode = WriteMode.READ) -> registry_map_entry:
+    name = "reg_" + str(register)
+    return registry_map_entry(registry_type=Registry_Type.INPUT, register=register, register_bit=0, register_byte=0,
+                              variable_name=name, documented_name=name, unit='', unit_mod=1, concatenate=False,
+                              concatenate_registers=(), values=(), data_type=data_type, write_mode=write_mode)
+
+
+def planner(settings : dict = None) -> protocol_settings:
+    protocolSettings = protocol_settings('eg4_v58')
+    protocolSettings.settings = settings if settings is not None else {"baud" : 9600, "batch_size" : 40}
+    return protocolSettings
+
+
+def test_merge_across_window():
+    #44 and 46 used to be two requests, because of the fixed 40 register windows
+    assert planner().calculate_registry_ranges([entry(44), entry(46)]) == [(44, 3)]
+    assert planner().calculate_registry_ranges([entry(39), entry(41)]) == [(39, 3)]
+
+
+def test_gap_cost():
+    protocolSettings = planner()
+    gap = protocolSettings.get_max_read_gap()
+    assert protocolSettings.calculate_registry_ranges([entry(0), entry(gap + 1)]) == [(0, gap + 2)]
+    assert protocolSettings.calculate_registry_ranges([entry(0), entry(gap + 2)]) == [(0, 1), (gap + 2, 1)]
+
+    #slow request overhead; worth reading more
+    assert planner({"baud" : 9600, "request_overhead" : 1}).get_max_read_gap() > gap
+
+
+def test_batch_size_and_blocked():
+    ranges = planner().calculate_registry_ranges([entry(register) for register in range(100)])
+    assert ranges == [(0, 40), (40, 40), (80, 20)]
+
+    #never read across disabled or unreadable registers
+    assert planner().calculate_registry_ranges([entry(1), entry(2, write_mode=WriteMode.READDISABLED), entry(3)]) == [(1, 1), (3, 1)]
+    assert planner().calculate_registry_ranges([entry(1), entry(3)], unreadable={2}) == [(1, 1), (3, 1)]
+
+
+def test_32bit_span():
+    assert planner().calculate_registry_ranges([entry(39, Data_Type.UINT)]) == [(39, 2)]
+
+
+def test_transport_gap(create_protocol, create_transport):
+    protocolSettings = planner()
+    assert protocolSettings.get_max_read_gap(115200) > protocolSettings.get_max_read_gap(9600) #registers are cheaper next to the turnaround
+    assert protocolSettings.get_max_read_gap(9600, batch_delay=0.85) > protocolSettings.get_max_read_gap(9600)
+    assert protocolSettings.get_max_read_gap(0) >= 45 #tcp; no per character cost
+
+    #a 40 register gap; not worth reading at 9600 baud
+    csv = 'variable name,documented name,data type,register,unit\nfirst,,USHORT,0,\nsecond,,USHORT,41,\n'
+    protocolSettings = create_protocol('gap_test', '{"transport" : "modbus_rtu", "baud" : 9600}', {'input_registry_map' : csv})
+    assert protocolSettings.get_registry_ranges(Registry_Type.INPUT) == [(0, 1), (41, 1)]
+
+    #the transport's bus, not the protocol's baud
+    assert create_transport(protocolSettings, rtu=True).get_read_ranges(Registry_Type.INPUT) == [(0, 1), (41, 1)]
+    assert create_transport(protocolSettings, rtu=True, baudrate=115200).get_read_ranges(Registry_Type.INPUT) == [(0, 42)]
+    assert create_transport(protocolSettings, rtu=True, batch_delay=0.1).get_read_ranges(Registry_Type.INPUT) == [(0, 42)]
+    assert create_transport(protocolSettings).get_read_ranges(Registry_Type.INPUT) == [(0, 42)] #tcp
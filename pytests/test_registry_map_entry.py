@@ -0,0 +1,54 @@
+import sys
+import os
+import pickle
+import dataclasses
+import pytest
+
+
+#move up a folder for tests
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from classes.protocol_settings import registry_map_entry, Registry_Type, Data_Type
+
+
+def create_entry(**kwargs) -> registry_map_entry:
+    fields = dict(registry_type=Registry_Type.HOLDING, register=10, register_bit=0, register_byte=0,
+                  variable_name="charge_current", documented_name="charge_current", unit='A', unit_mod=0.1, concatenate=False,
+                  concatenate_registers=(), values=(range(0, 1001), 2000))
+    fields.update(kwargs)
+    return registry_map_entry(**fields)
+
+
+def test_immutable():
+    entry = create_entry()
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        entry.register = 11
+
+    assert not hasattr(entry, '__dict__') #slotted
+
+
+def test_pickle():
+    entry = create_entry(data_type=Data_Type.SHORT, poll_interval=5, deadband=0.5)
+    loaded = pickle.loads(pickle.dumps(entry))
+
+    assert all(getattr(loaded, name) == getattr(entry, name) for name in registry_map_entry.__slots__)
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        loaded.register = 11
+
+
+def test_replace():
+    entry = create_entry()
+    moved = dataclasses.replace(entry, register=20, concatenate=True, concatenate_registers=(20, 21))
+
+    assert (moved.register, moved.concatenate, moved.concatenate_registers) == (20, True, (20, 21))
+    assert moved.variable_name == entry.variable_name and moved.values is entry.values
+    assert (entry.register, entry.concatenate, entry.concatenate_registers) == (10, False, ())
+    assert not hasattr(moved, '__dict__')
+
+
+def test_wide_value_range(create_protocol):
+    csv = 'variable name,documented name,data type,register,unit,values\nwide,,USHORT,1,,"0-1000, 2000, 3000-65535"\n'
+    protocolSettings = create_protocol('range_test', maps={'holding_registry_map' : csv})
+
+    entry = protocolSettings.get_registry_map(Registry_Type.HOLDING)[0]
+    assert entry.values == (range(0, 1001), '2000', range(3000, 65536)) #not one int per value
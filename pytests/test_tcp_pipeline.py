@@ -0,0 +1,135 @@
+import sys
+import os
+import socket
+import struct
+import threading
+import time
+
+
+#move up a folder for tests
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from classes.protocol_settings import Registry_Type
+
+
+class mbap_server(threading.Thread):
+    ''' answers register reads with the register numbers; replies to each burst of requests in reverse order '''
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.bind(('127.0.0.1', 0))
+        self.listener.listen(1)
+        self.port = self.listener.getsockname()[1]
+        self.bursts : list[int] = []
+        self.units : list[int] = []
+
+    def run(self):
+        connection, _ = self.listener.accept()
+        buffer = b''
+        while True:
+            connection.settimeout(None if not buffer else 0.05)
+            try:
+                data = connection.recv(1024)
+                if not data:
+                    return
+                buffer += data
+                continue
+            except socket.timeout:
+                pass
+
+            requests = [buffer[i:i+12] for i in range(0, len(buffer), 12)]
+            buffer = b''
+            self.bursts.append(len(requests))
+            for request in reversed(requests):
+                transaction_id, _, _, unit, function_code, start, count = struct.unpack('>HHHBBHH', request)
+                self.units.append(unit)
+                if start >= 1000: #illegal address
+                    connection.sendall(struct.pack('>HHHBBB', transaction_id, 0, 3, unit, function_code | 0x80, 2))
+                    continue
+                registers = list(range(start, start + count))
+                pdu = struct.pack('>BB' + str(count) + 'H', function_code, count * 2, *registers)
+                connection.sendall(struct.pack('>HHHB', transaction_id, 0, len(pdu) + 1, unit) + pdu)
+
+
+def not_pipelined(start, count, registry_type):
+    raise AssertionError("read " + str(start) + " wasn't pipelined")
+
+
+def test_pipeline(create_transport):
+    server = mbap_server()
+    server.start()
+
+    transport = create_transport(port=server.port, batch_delay=1, pipeline_window=3)
+    transport.respond = not_pipelined
+
+    ranges = [(0, 10), (20, 5), (40, 2), (60, 1), (80, 3)]
+    start = time.perf_counter()
+    registry = transport.read_modbus_registers(ranges)
+    assert time.perf_counter() - start < 1 #no sleeping between pipelined reads
+
+    assert registry == {register : register for start, count in ranges for register in range(start, start + count)}
+    assert max(server.bursts) <= 3
+    assert not transport._prefetched
+    transport.close_pipeline()
+
+
+def test_exception_response(create_transport):
+    server = mbap_server()
+    server.start()
+
+    transport = create_transport(port=server.port, pipeline_window=4)
+    transport.respond = not_pipelined
+
+    transport.prefetch_registers([(0, 2, Registry_Type.INPUT), (1000, 2, Registry_Type.HOLDING)])
+    assert transport.read_registers(0, 2, Registry_Type.INPUT).registers == [0, 1]
+
+    response = transport.read_registers(1000, 2, Registry_Type.HOLDING)
+    assert response.isError() and response.exception_code == 2
+    transport.close_pipeline()
+
+
+def test_unit_address(create_transport):
+    server = mbap_server()
+    server.start()
+
+    transport = create_transport(port=server.port, pipeline_window=2, address=5)
+    transport.respond = not_pipelined
+
+    transport.prefetch_registers([(0, 2, Registry_Type.INPUT), (10, 1, Registry_Type.INPUT)])
+    assert transport.read_registers(10, 1, Registry_Type.INPUT).registers == [10]
+    assert server.units == [5, 5]
+    transport.close_pipeline()
+
+
+def test_failed_pipeline_rests_bus(create_transport, monkeypatch):
+    transport = create_transport(batch_delay=0.5, pipeline_window=3) #nothing listens on the port; the pipeline fails
+
+    sleeps : list[float] = []
+    monkeypatch.setattr(time, 'sleep', sleeps.append)
+
+    ranges = [(0, 2), (20, 1), (40, 1)]
+    transport.read_modbus_registers(ranges)
+    assert [(start, count) for address, start, count in transport.requests] == ranges
+    assert sleeps == [0.5] * len(ranges)
+
+
+class connecting_client:
+    def connect(self):
+        return True
+
+
+def test_reconnect_closes_pipeline(create_transport):
+    server = mbap_server()
+    server.start()
+
+    transport = create_transport(port=server.port, pipeline_window=2)
+    transport.respond = not_pipelined
+    transport.prefetch_registers([(0, 2, Registry_Type.INPUT), (10, 1, Registry_Type.INPUT)])
+    pipeline = transport._pipeline_socket
+    assert pipeline is not None
+
+    transport.client = connecting_client()
+    transport.first_connect = False
+    transport.connect()
+    assert transport._pipeline_socket is None
+    assert pipeline.fileno() == -1 #closed
@@ -0,0 +1,59 @@
+import sys
+import os
+import time
+import logging
+
+#move up a folder for tests
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))) 
+
+from classes.transport_scheduler import transport_scheduler
+from conftest import modbus_section
+
+
+def test_passive_transport_not_scheduled(create_stub_transport):
+    scheduler = transport_scheduler([create_stub_transport("mqtt", 0)])
+    assert scheduler.next_due() is None
+
+def test_deadline_order(create_stub_transport):
+    fast = create_stub_transport("fast", 0.5)
+    slow = create_stub_transport("slow", 10)
+    scheduler = transport_scheduler()
+    scheduler.add(fast, due=100)
+    scheduler.add(slow, due=100)
+
+    due = scheduler.pop_due(now=100)
+    assert [transport for transport, _ in due] == [fast, slow]
+    assert scheduler.next_due() == 100.5
+
+    due = scheduler.pop_due(now=100.6)
+    assert due == [(fast, 100.5)]
+    assert scheduler.next_due() == 101
+
+def test_missed_deadlines_are_skipped(create_stub_transport):
+    transport = create_stub_transport("slow_bus", 10)
+    scheduler = transport_scheduler()
+    scheduler.add(transport, due=100)
+
+    (popped, due), = scheduler.pop_due(now=125)
+    assert due == 100
+    #stays on the original grid
+    assert scheduler.next_due() == 130
+
+
+def test_lateness_at_read_start(create_gateway, caplog):
+    gateway = create_gateway(modbus_section('transport.a', 1, read_interval=10) + modbus_section('transport.b', 2, read_interval=10))
+    first, second = gateway._Protocol_Gateway__transports
+    for transport in (first, second):
+        transport.connected = True
+    first.read_devices = lambda: time.sleep(0.2) or []
+    second.read_devices = lambda: []
+
+    #both popped in one batch; the second waits for the first
+    due = time.monotonic()
+    with caplog.at_level(logging.DEBUG, logger='invertermodbustomqqt_log'):
+        gateway.read_transport(first, due)
+        gateway.read_transport(second, due)
+
+    lateness = {record.getMessage().split()[0] : float(record.getMessage().split()[3][:-1]) for record in caplog.records if 'late' in record.getMessage()}
+    assert lateness['transport.a'] < 0.1
+    assert lateness['transport.b'] >= 0.2
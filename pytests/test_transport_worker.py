@@ -0,0 +1,54 @@
+import sys
+import os
+import queue
+import threading
+import time
+
+#move up a folder for tests
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from classes.transport_worker import transport_worker
+
+
+def test_one_worker_per_bus_in_order(create_stub_transport):
+    first = create_stub_transport("first", 0.05)
+    second = create_stub_transport("second", 0.05)
+    reads : list[tuple[str, str]] = []
+
+    def read(transport, due):
+        reads.append((transport.transport_name, threading.current_thread().name))
+        return [(transport, {'value' : len(reads)})]
+
+    results : queue.Queue = queue.Queue()
+    worker = transport_worker("bus", [first, second], read, results)
+    worker.start()
+    time.sleep(0.2)
+    worker.stop()
+    worker.join(1)
+
+    assert len(reads) >= 4
+    assert {thread for _, thread in reads} == {"worker[bus]"}
+    assert [name for name, _ in reads[:4]] == ["first", "second", "first", "second"]
+
+    transport, device, info = results.get_nowait()
+    assert transport is first and device is first and info == {'value' : 1}
+
+
+def test_stop_interrupts_sleep(create_stub_transport):
+    transport = create_stub_transport("slow", 60)
+    worker = transport_worker("bus", [transport], lambda transport, due: [], queue.Queue())
+    worker.start()
+    time.sleep(0.05)
+
+    start = time.monotonic()
+    worker.stop()
+    worker.join(1)
+    assert not worker.is_alive()
+    assert time.monotonic() - start < 1
+
+
+def test_passive_bus_exits(create_stub_transport):
+    worker = transport_worker("bus", [create_stub_transport("mqtt", 0)], lambda transport, due: [], queue.Queue())
+    worker.start()
+    worker.join(1)
+    assert not worker.is_alive()
@@ -0,0 +1,39 @@
+import sys
+import os
+
+
+#move up a folder for tests
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from pymodbus.pdu import ExceptionResponse
+
+from classes.protocol_settings import Registry_Type
+
+
+def with_holes(transport, holes : set[int]):
+    ''' illegal address for any read covering a hole '''
+    def respond(start, count, registry_type):
+        if holes.intersection(range(start, start + count)):
+            return ExceptionResponse(4, 2)
+        return transport.registers_response(list(range(start, start + count)))
+
+    transport.respond = respond
+    return transport
+
+
+def test_bisect_and_persist(create_transport, tmp_path):
+    transport = with_holes(create_transport(serial_number='test123'), holes={5})
+
+    registry = transport.read_modbus_registers([(0, 8)])
+    assert sorted(registry) == [0, 1, 2, 3, 4, 6, 7]
+    assert transport.unreadable_registers[Registry_Type.INPUT] == {5}
+    assert len(transport.requests) < 8
+
+    #learned holes are saved per device, and loaded by the next start
+    assert os.listdir(str(tmp_path / 'state'))
+    transport = create_transport(serial_number='test123')
+    transport.load_unreadable_registers()
+    assert transport.unreadable_registers[Registry_Type.INPUT] == {5}
+
+    for start, count in transport.get_read_ranges(Registry_Type.INPUT):
+        assert not (start <= 5 < start + count)
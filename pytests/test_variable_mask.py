@@ -0,0 +1,56 @@
+import sys
+import os
+import pytest
+
+
+#move up a folder for tests
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from classes.protocol_settings import protocol_settings, Registry_Type
+
+
+def create_mask_protocol(create_protocol, **kwargs):
+    csv = 'variable name,documented name,data type,register,unit\n' + ''.join('var_' + str(register) + ',,USHORT,' + str(register) + ',\n' for register in range(400))
+    return create_protocol('mask_test', maps={'input_registry_map' : csv}, **kwargs)
+
+
+def test_mask_ranges(create_protocol):
+    protocolSettings = create_mask_protocol(create_protocol, variable_mask={'VAR_10', 'var_11', 'var_300'})
+
+    assert [entry.variable_name for entry in protocolSettings.get_registry_map(Registry_Type.INPUT)] == ['var_10', 'var_11', 'var_300']
+    assert protocolSettings.registry_map_ranges[Registry_Type.INPUT] == [(10, 2), (300, 1)]
+
+
+def test_screen(create_protocol):
+    protocolSettings = create_mask_protocol(create_protocol, variable_screen={'var_0', 'var_1'})
+
+    names = {entry.variable_name for entry in protocolSettings.get_registry_map(Registry_Type.INPUT)}
+    assert len(names) == 398
+    assert 'var_0' not in names and 'var_1' not in names
+
+
+def test_parse_variable_list(tmp_path):
+    assert protocol_settings.parse_variable_list(' Var_1, var_2 ,,') == {'var_1', 'var_2'}
+
+    path = str(tmp_path / 'mask.txt')
+    with open(path, 'w') as f:
+        f.write('#comment\nvar_3\n\nVar_4\n')
+
+    assert protocol_settings.parse_variable_list(path) == {'var_3', 'var_4'}
+
+    #a missing file is not a variable name
+    for missing in [str(tmp_path / 'missing.txt'), 'masks/inverter1', 'variable_mask.TXT']:
+        with pytest.raises(FileNotFoundError):
+            protocol_settings.parse_variable_list(missing)
+
+
+def test_cache_per_mask(create_protocol, tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    masked = create_mask_protocol(create_protocol, cache_dir=cache_dir, variable_mask={'var_10'})
+    unmasked = create_mask_protocol(create_protocol, cache_dir=cache_dir)
+    assert masked.get_cache_path() != unmasked.get_cache_path()
+    assert len(os.listdir(cache_dir)) == 2
+
+    #both reload from their own cache
+    assert len(create_mask_protocol(create_protocol, cache_dir=cache_dir, variable_mask={'var_10'}).get_registry_map(Registry_Type.INPUT)) == 1
+    assert len(create_mask_protocol(create_protocol, cache_dir=cache_dir).get_registry_map(Registry_Type.INPUT)) == 400